@@ -1,11 +1,15 @@
-from pydantic import BaseModel
-from typing import List, Dict
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional
 
 class QueryRequest(BaseModel):
     query: str
+    page_size: Optional[int] = Field(default=None, gt=0)  # return one page at a time
+    cursor: Optional[str] = None  # next_cursor from the previous page
 
 class QueryResponse(BaseModel):
     columns: List[str]
     data: List[Dict]
     row_count: int
-    execution_time: float
\ No newline at end of file
+    execution_time: float
+    truncated: bool = False  # stopped at the server row cap
+    next_cursor: Optional[str] = None
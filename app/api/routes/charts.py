@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from app.core.chart_store import get_chart_store
+
+router = APIRouter()
+
+# Chart IDs are content hashes, so a stored chart never changes
+CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+@router.get("/charts/{chart_id}")
+async def get_chart(chart_id: str, request: Request):
+    path = get_chart_store().path_for(chart_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Chart not found")
+
+    etag = f'"{chart_id}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={**CACHE_HEADERS, "ETag": etag})
+    return FileResponse(path, media_type="image/png", headers={**CACHE_HEADERS, "ETag": etag})
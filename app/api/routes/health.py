@@ -1,10 +1,21 @@
 from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from app.core.kusto_client import get_kusto_manager
 
 router = APIRouter()  # Remove the tags configuration
 
 @router.get("/health", status_code=status.HTTP_200_OK)
 async def health_check():
+    # Not ready until the Kusto client has a token and a warm connection
+    if not get_kusto_manager().ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "status": "starting",
+                "message": "Kusto client is warming up"
+            }
+        )
     return {
         "status": "healthy",
         "message": "Application is running"
-    }
\ No newline at end of file
+    }
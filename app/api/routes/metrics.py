@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    # Prometheus text format: stage/tool latency histograms, rows, bytes and LLM tokens
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -1,39 +1,264 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from azure.kusto.data import ClientRequestProperties
 from app.api.models.query import QueryRequest, QueryResponse
-from app.core.kusto_client import get_kusto_client
 from app.config import get_settings
-from datetime import datetime
+from app.core.kusto_client import execute_kusto_query, iter_kusto_batches, open_kusto_stream
+from app.core.query_scheduler import QueryRejected
+from app.utils.request_helper import cancel_on_disconnect
+from starlette.background import BackgroundTask
+from datetime import date, datetime
+from typing import Optional
+import base64
+import binascii
+import hashlib
+import io
+import json
+import logging
+import pyarrow as pa
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
 
-@router.post("/query", response_model=QueryResponse)
-async def execute_query(request: QueryRequest):
+# Kusto column types with a direct Arrow equivalent; everything else is sent as text
+ARROW_TYPES = {
+    "bool": pa.bool_(),
+    "int": pa.int32(),
+    "long": pa.int64(),
+    "real": pa.float64(),
+    "datetime": pa.timestamp("us", tz="UTC"),
+}
+
+
+def json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def row_dict(columns: list, row: list) -> dict:
+    # JSON and NDJSON responses format values the same way: what JSON has no
+    # type for (datetimes, timespans, decimals) goes through json_value
+    return {
+        column: value if value is None or isinstance(value, (str, int, float, bool, dict, list)) else json_value(value)
+        for column, value in zip(columns, row)
+    }
+
+
+def text_value(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=json_value)
+    return json_value(value)
+
+
+def query_fingerprint(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(query: str, offset: int) -> str:
+    cursor = json.dumps({"query": query_fingerprint(query), "offset": offset})
+    return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(query: str, cursor: str) -> int:
     try:
-        client = get_kusto_client()
-        settings = get_settings()
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(decoded["offset"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if decoded.get("query") != query_fingerprint(query) or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this query")
+    return offset
+
+
+class RowWindow:
+    """
+    Reads rows [offset, offset + limit) of a streaming result, skipping the
+    earlier rows as they go past. After iterating, `more` tells whether the
+    result had rows beyond the window and `exhausted` whether every row of
+    the result was read.
+
+    Pages are positional, so queries should sort their output (e.g. with
+    `order by`) for cursors to be stable between calls. Every page runs the
+    query again and skips the earlier rows as they stream past, so reading
+    page N transfers about N pages of rows; QUERY_MAX_ROWS bounds the total.
+    Queries are arbitrary KQL (let statements, several statements, control
+    commands), so the offset cannot be pushed into them safely.
+    """
+
+    def __init__(self, table, offset: int, limit: int, max_rows: int, batch_size: int):
+        self.table = table
+        self.offset = offset
+        self.limit = limit
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.row_count = 0
+        self.more = False
+        self.exhausted = False
+
+    async def batches(self):
+        skipped = 0
+        async for rows in iter_kusto_batches(self.table, self.batch_size):
+            if skipped < self.offset:
+                dropped = min(self.offset - skipped, len(rows))
+                skipped += dropped
+                rows = rows[dropped:]
+                if not rows:
+                    continue
+
+            remaining = self.limit - self.row_count
+            if len(rows) > remaining:
+                self.more = True
+                rows = rows[:remaining]
+            if rows:
+                self.row_count += len(rows)
+                yield rows
+            if self.more:
+                return
+        self.exhausted = True
+
+    def page_info(self, query: str) -> dict:
+        end = self.offset + self.row_count
+        return {
+            "row_count": self.row_count,
+            "truncated": self.more and end >= self.max_rows,
+            "next_cursor": encode_cursor(query, end) if self.more and end < self.max_rows else None,
+        }
+
+
+def arrow_batch(schema: pa.Schema, rows: list) -> pa.RecordBatch:
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [text_value(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
 
+
+def finish_query(lease, window: RowWindow):
+    # Anything left unread (a page or the row cap was reached, or the client
+    # went away) is cancelled on the server
+    lease.completed = lease.completed or window.exhausted
+    lease.release()
+
+
+async def ndjson_stream(query: str, table, lease, window: RowWindow, start_time: datetime):
+    # First line describes the columns, then one object per row, then a
+    # trailer with the row count and the cursor for the next page
+    columns = [col.column_name for col in table.columns]
+    yield json.dumps({"columns": [{"name": col.column_name, "type": col.column_type} for col in table.columns]}) + "\n"
+    try:
+        async for rows in window.batches():
+            yield "".join(json.dumps(row_dict(columns, row), default=json_value) + "\n" for row in rows)
+    except Exception as e:
+        logging.error(f"Query stream failed after {window.row_count} rows: {e}")
+        lease.completed = True
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+    finally:
+        finish_query(lease, window)
+    yield json.dumps({
+        **window.page_info(query),
+        "execution_time": (datetime.now() - start_time).total_seconds()
+    }) + "\n"
+
+
+async def arrow_stream(table, lease, window: RowWindow):
+    schema = pa.schema([
+        pa.field(col.column_name, ARROW_TYPES.get(col.column_type, pa.string())) for col in table.columns
+    ])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def take_bytes() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    try:
+        async for rows in window.batches():
+            writer.write_batch(arrow_batch(schema, rows))
+            yield take_bytes()
+    except Exception as e:
+        # Abort without the end-of-stream marker so the client sees an incomplete stream
+        logging.error(f"Arrow query stream failed after {window.row_count} rows: {e}")
+        lease.completed = True
+        raise
+    finally:
+        finish_query(lease, window)
+    writer.close()
+    yield take_bytes()
+
+
+@router.post("/query", response_model=QueryResponse)
+async def execute_query(request: QueryRequest, http_request: Request):
+    settings = get_settings()
+    offset = decode_cursor(request.query, request.cursor) if request.cursor else 0
+    limit = max(0, min(request.page_size or settings.QUERY_MAX_ROWS, settings.QUERY_MAX_ROWS - offset))
+    accept = http_request.headers.get("accept", "")
+
+    try:
         start_time = datetime.now()
-        response = client.execute(settings.KUSTO_DATABASE_NAME, request.query)
-        execution_time = (datetime.now() - start_time).total_seconds()
 
-        results = response.primary_results[0]
-        columns = [col.column_name for col in results.columns]
+        # Let the server stop one row past the cap; we never read further than that
+        properties = ClientRequestProperties()
+        properties.set_option("truncationmaxrecords", settings.QUERY_MAX_ROWS + 1)
+        table, lease = await cancel_on_disconnect(http_request, open_kusto_stream(request.query, properties=properties))
+        window = RowWindow(table, offset, limit, settings.QUERY_MAX_ROWS, settings.QUERY_STREAM_BATCH_ROWS)
+        headers = {"X-Row-Limit": str(settings.QUERY_MAX_ROWS)}
+
+        # The streams release the lease themselves; the background task covers
+        # a client that disconnects before the first chunk
+        if NDJSON_MEDIA_TYPE in accept:
+            return StreamingResponse(
+                ndjson_stream(request.query, table, lease, window, start_time),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers=headers,
+                background=BackgroundTask(finish_query, lease, window)
+            )
+        if ARROW_MEDIA_TYPE in accept:
+            return StreamingResponse(
+                arrow_stream(table, lease, window),
+                media_type=ARROW_MEDIA_TYPE,
+                headers=headers,
+                background=BackgroundTask(finish_query, lease, window)
+            )
 
+        columns = [col.column_name for col in table.columns]
         data = []
-        for row in results:
-            row_dict = {}
-            for i, value in enumerate(row):
-                row_dict[columns[i]] = value
-            data.append(row_dict)
+
+        async def read_rows():
+            async for rows in window.batches():
+                data.extend(row_dict(columns, row) for row in rows)
+
+        try:
+            await cancel_on_disconnect(http_request, read_rows())
+        except HTTPException:
+            raise
+        except Exception:
+            lease.completed = True
+            raise
+        finally:
+            finish_query(lease, window)
+        execution_time = (datetime.now() - start_time).total_seconds()
 
         return {
             "columns": columns,
             "data": data,
-            "row_count": len(data),
+            **window.page_info(request.query),
             "execution_time": execution_time
         }
 
+    except QueryRejected as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -41,14 +266,13 @@ async def execute_query(request: QueryRequest):
 @router.get("/tables")
 async def get_tables():
     try:
-        client = get_kusto_client()
-        settings = get_settings()
-
         query = ".show tables"
-        response = client.execute(settings.KUSTO_DATABASE_NAME, query)
+        response = await execute_kusto_query(query)
 
         tables = [row["TableName"] for row in response.primary_results[0]]
         return {"tables": tables}
 
+    except QueryRejected as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, status
+from app.core.analyzer_pool import get_analyzer_pool
+from app.core.api_catalog import get_api_catalog
+from app.core.chart_store import get_chart_store
+from app.core.code_cache import get_code_cache
+from app.core.forecasting import get_forecaster
+from app.core.insight_engine import get_insight_engine
+from app.core.kusto_client import get_kusto_manager
+from app.core.llm_clients import llm_coalescing_stats
+from app.core.log_config import logging_stats
+from app.core.prompt_budget import get_prompt_governor
+from app.core.query_scheduler import get_query_scheduler
+from app.core.result_cache import get_tool_cache
+from app.core.rollup_store import get_rollup_store
+from app.core.single_flight import single_flight_stats
+
+router = APIRouter()
+
+@router.get("/stats", status_code=status.HTTP_200_OK)
+async def get_stats():
+    return {
+        "tool_cache": get_tool_cache().stats(),
+        "rollups": get_rollup_store().stats(),
+        "api_catalog": get_api_catalog().stats(),
+        "analyzer_pool": get_analyzer_pool().stats(),
+        "code_cache": get_code_cache().stats(),
+        "insight_engine": get_insight_engine().stats(),
+        "forecasting": get_forecaster().stats(),
+        "chart_store": get_chart_store().stats(),
+        "prompts": get_prompt_governor().stats(),
+        "kusto_queries": get_query_scheduler().stats(),
+        "kusto_client": get_kusto_manager().stats(),
+        "logging": logging_stats(),
+        "coalescing": {**single_flight_stats(), "llm": llm_coalescing_stats()}
+    }
@@ -1,19 +1,12 @@
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
-import json
 from app.config import get_settings
+from app.core.llm_clients import coalesced_openai_completion
+from app.tools.registry import get_tool_registry
 from pydantic import BaseModel
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 router = APIRouter()
 
-# Load tool details from file
-with open("app/tools/tool_details.json", "r") as file:
-    tool_details = json.load(file)
-
 class ToolRequest(BaseModel):
     user_query: str
 
@@ -25,10 +18,10 @@ async def select_tools(request: ToolRequest):
         logging.info(f"User query: {request.user_query}")
 
         settings = get_settings()
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        logging.info("Initialized OpenAI client")
+        tool_details = get_tool_registry().describe()
 
-        response = client.chat.completions.create(
+        response = await coalesced_openai_completion(
+            "select_tools",
             model=settings.OPEN_AI_MODEL,
             messages=[
                 {
@@ -51,7 +44,7 @@ async def select_tools(request: ToolRequest):
             max_tokens=2000
         )
         
-        # Rest of the function remains the same        logging.info("Received response from OpenAI")
+        logging.info("Received response from OpenAI")
 
         response_content = response.choices[0].message.content.strip()
         logging.info(f"Response content: {response_content}")
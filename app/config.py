@@ -2,6 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -17,13 +18,66 @@ class Settings(BaseSettings):
     API_PREFIX: str = "/api"
     DEBUG_MODE: bool = False
 
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000  # records waiting for the log writer thread; more are dropped
+    LOG_PAYLOAD_MAX_CHARS: int = 2000  # longer payloads are logged as a summary
+    LOG_VERBOSE_SAMPLE_RATE: float = 0.0  # share of requests that log full payloads
+
+    # Execution Settings
+    KUSTO_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # refresh the AAD token this long before it expires
+    KUSTO_WARMUP_RETRY_SECONDS: int = 15  # delay between failed warm-ups or token refreshes
+    KUSTO_WARMUP_TIMEOUT_SECONDS: int = 30  # longest a warm-up attempt may take before it is retried
+    KUSTO_MAX_CONCURRENT_QUERIES: int = 6  # queries in flight per cluster/database
+    KUSTO_QUERY_QUEUE_DEPTH: int = 32  # queries allowed to wait for a slot
+    KUSTO_QUERY_QUEUE_TIMEOUT_SECONDS: int = 30  # longest wait for a slot before a 503
+    CHAT_MAX_TOOL_FANOUT: int = 3  # concurrent tool fetches per /chat request
+    CHAT_BATCH_MAX_QUERIES: int = 50  # questions accepted by one /chat/batch request
+    CHAT_BATCH_CONCURRENCY: int = 4  # questions of a batch answered at once
+    TOOL_TIMEOUT_SECONDS: int = 60  # per-tool data fetch limit
+    ANALYZER_TIMEOUT_SECONDS: int = 120  # wall-clock limit for generated analyzer code
+    ANALYZER_POOL_SIZE: int = 2  # warm analyzer worker processes
+    ANALYZER_QUEUE_DEPTH: int = 16  # jobs allowed to wait for a free worker
+    ANALYZER_WORKER_MAX_JOBS: int = 50  # jobs before a worker is recycled
+    ANALYZER_WORKER_MAX_RSS_MB: int = 1024  # resident memory before a worker is recycled
+    QUERY_MAX_ROWS: int = 100000  # hard cap on rows /query returns, in every mode
+    QUERY_STREAM_BATCH_ROWS: int = 5000  # rows decoded per step when reading /query results
+    INSIGHT_ENGINE_ENABLED: bool = True  # answer common question shapes without code generation
+    FORECAST_MAX_HORIZON: int = 168  # most buckets a forecast may extend past the data
+
+    # Cache Settings
+    TOOL_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # eviction budget for cached tool results
+    TOOL_CACHE_SETTLE_SECONDS: int = 900  # ingestion lag before a bucket is treated as closed
+    API_CATALOG_TTL_SECONDS: int = 600  # catalog age before a background refresh
+    API_CATALOG_MAX_STALE_SECONDS: int = 3600  # extra age a stale catalog may still be served
+    CODE_CACHE_PATH: str = ".cache/analyzer_code_cache.json"  # persisted generated analyzer code
+    CODE_CACHE_MAX_ENTRIES: int = 500
+    FORECAST_CACHE_MAX_ENTRIES: int = 256  # fitted models kept per (api, metric, bucket size)
+    CHART_STORE_DIR: str = ".cache/charts"  # content-addressed chart PNGs served from /charts
+    CHART_STORE_MAX_BYTES: int = 512 * 1024 * 1024
+    ROLLUP_ENABLED: bool = True  # keep hourly/daily tool results in a local store, synced in the background
+    ROLLUP_DB_PATH: str = ".cache/rollups.db"
+    ROLLUP_HOURLY_RETENTION_DAYS: int = 31
+    ROLLUP_DAILY_RETENTION_DAYS: int = 186
+    ROLLUP_SYNC_INTERVAL_SECONDS: int = 900  # how often newly settled buckets are appended
+
+    # Prompt Budgets (tokens); larger prompts are compacted before sending
+    CODEGEN_PROMPT_MAX_TOKENS: int = 12000
+    SUMMARY_PROMPT_MAX_TOKENS: int = 6000
+
     # OpenAI Settings
     OPENAI_API_KEY: str
     OPEN_AI_MODEL: str = "gpt-4"  # default model
+    OPENAI_BASE_URL: Optional[str] = None  # alternative endpoint, e.g. the benchmark stand-in
 
     # Anthropic Settings
     ANTHROPIC_API_KEY: str
     ANTHROPIC_MODEL: str = "claude-3-sonnet-20240229"  # default model
+    ANTHROPIC_BASE_URL: Optional[str] = None  # alternative endpoint, e.g. the benchmark stand-in
+
+    # Temperature of extract_data, select_tools and analyzer code generation; None keeps the
+    # provider default. At 0 identical concurrent calls are coalesced into one.
+    LLM_PLANNING_TEMPERATURE: Optional[float] = None
 
     # Organization Settings
     ORGANIZATION_ID: str
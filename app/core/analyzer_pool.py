@@ -0,0 +1,198 @@
+from app.config import get_settings
+from app.core.metrics import STAGE_SECONDS, timed
+from fastapi import HTTPException
+from functools import lru_cache
+from typing import Optional, Set
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyzer_worker.py")
+
+# Results carry base64 charts, so allow long protocol lines
+PROTOCOL_LINE_LIMIT = 256 * 1024 * 1024
+
+
+class AnalyzerWorker:
+    def __init__(self):
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.jobs_done = 0
+        self.rss = 0
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=PROTOCOL_LINE_LIMIT
+        )
+        message = await self._read()
+        if not message.get("ready"):
+            raise RuntimeError("Analyzer worker failed to start")
+        self.rss = message.get("rss", 0)
+
+    async def run(self, code: str, data_dir: str) -> dict:
+        self.process.stdin.write((json.dumps({"code": code, "data_dir": data_dir}) + "\n").encode("utf-8"))
+        await self.process.stdin.drain()
+        message = await self._read()
+        self.jobs_done += 1
+        self.rss = message.get("rss", 0)
+        return message["result"]
+
+    async def _read(self) -> dict:
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"Analyzer worker exited with code {await self.process.wait()}")
+        return json.loads(line)
+
+    async def stop(self):
+        if self.process and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+
+
+class AnalyzerPool:
+    """
+    Pool of pre-started analyzer processes with pandas, numpy and matplotlib
+    already imported.
+
+    Jobs wait for an idle worker in a bounded queue, for at most the job
+    timeout. A worker that times out or dies is killed and replaced; workers
+    are also recycled after a number of jobs or once their resident memory
+    grows past the configured limit.
+    """
+
+    def __init__(self, size: int, max_queue: int, max_jobs_per_worker: int, max_rss_bytes: int, job_timeout: float):
+        self.size = size
+        self.max_queue = max_queue
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_bytes = max_rss_bytes
+        self.job_timeout = job_timeout
+        self._idle: "asyncio.Queue[AnalyzerWorker]" = asyncio.Queue()
+        self._workers: Set[AnalyzerWorker] = set()
+        self._background: Set[asyncio.Task] = set()
+        self._started = False
+        self.waiting = 0
+        self.jobs = 0
+        self.timeouts = 0
+        self.checkout_timeouts = 0
+        self.failures = 0
+        self.recycled = 0
+        self.rejected = 0
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        for _ in range(self.size):
+            self._spawn_in_background()
+
+    async def stop(self):
+        for task in list(self._background):
+            task.cancel()
+        for worker in list(self._workers):
+            await worker.stop()
+        self._workers.clear()
+        self._started = False
+
+    async def run(self, code: str, data_dir: str) -> dict:
+        self.start()
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Analyzer queue is full, please retry shortly")
+
+        self.waiting += 1
+        try:
+            with timed("analyzer_queue"):
+                # Workers that keep crashing or failing to spawn must not leave jobs waiting forever
+                worker = await asyncio.wait_for(self._idle.get(), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            self.checkout_timeouts += 1
+            raise HTTPException(status_code=503, detail=f"No analyzer worker free within {self.job_timeout} seconds, please retry shortly")
+        finally:
+            self.waiting -= 1
+
+        self.jobs += 1
+        healthy = False
+        try:
+            with timed("analyzer_run"):
+                result = await asyncio.wait_for(worker.run(code, data_dir), timeout=self.job_timeout)
+            healthy = True
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise Exception(f"Analyzer did not finish within {self.job_timeout} seconds")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            if healthy and not self._needs_recycle(worker):
+                self._idle.put_nowait(worker)
+            else:
+                self._replace_in_background(worker)
+
+    def _needs_recycle(self, worker: AnalyzerWorker) -> bool:
+        return worker.jobs_done >= self.max_jobs_per_worker or worker.rss > self.max_rss_bytes
+
+    def _spawn_in_background(self):
+        self._track(asyncio.ensure_future(self._spawn()))
+
+    def _replace_in_background(self, worker: AnalyzerWorker):
+        self.recycled += 1
+        self._workers.discard(worker)
+        logging.info(f"Recycling analyzer worker after {worker.jobs_done} jobs ({worker.rss} bytes RSS)")
+        self._track(asyncio.ensure_future(worker.stop()))
+        self._spawn_in_background()
+
+    def _track(self, task: asyncio.Task):
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _spawn(self):
+        worker = AnalyzerWorker()
+        started = time.perf_counter()
+        try:
+            await worker.start()
+        except Exception as e:
+            logging.error(f"Failed to start analyzer worker: {e}")
+            await worker.stop()
+            # Back off before trying again so a broken interpreter doesn't spin
+            await asyncio.sleep(5)
+            self._spawn_in_background()
+            return
+        # Spawns happen off the request path, so they only go to the histogram
+        STAGE_SECONDS.labels(stage="analyzer_spawn").observe(time.perf_counter() - started)
+        self._workers.add(worker)
+        self._idle.put_nowait(worker)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "workers": len(self._workers),
+            "idle": self._idle.qsize(),
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "jobs": self.jobs,
+            "timeouts": self.timeouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "failures": self.failures,
+            "recycled": self.recycled,
+            "rejected": self.rejected,
+        }
+
+
+@lru_cache()
+def get_analyzer_pool() -> AnalyzerPool:
+    settings = get_settings()
+    return AnalyzerPool(
+        size=settings.ANALYZER_POOL_SIZE,
+        max_queue=settings.ANALYZER_QUEUE_DEPTH,
+        max_jobs_per_worker=settings.ANALYZER_WORKER_MAX_JOBS,
+        max_rss_bytes=settings.ANALYZER_WORKER_MAX_RSS_MB * 1024 * 1024,
+        job_timeout=settings.ANALYZER_TIMEOUT_SECONDS
+    )
@@ -0,0 +1,118 @@
+"""
+Long-lived analyzer worker.
+
+Started by AnalyzerPool as a plain script (it does not import the app). The
+heavy libraries are imported once; each job then runs the generated
+data_analyzer in a fresh namespace. Jobs arrive on stdin and results leave on
+the original stdout as one JSON document per line. Anything the generated code
+prints goes to stderr so it cannot corrupt the protocol.
+"""
+import os
+import sys
+
+# Keep the real stdout for the protocol and send stray prints to stderr
+_protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+os.dup2(2, 1)
+sys.stdout = sys.stderr
+
+import base64
+import gc
+import io
+import json
+import resource
+import traceback
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytz
+
+# Names the generated code expects to find without importing them
+PRELOADED = {
+    "pd": pd,
+    "np": np,
+    "plt": plt,
+    "datetime": datetime,
+    "timedelta": timedelta,
+    "pytz": pytz,
+    "json": json,
+    "io": io,
+    "base64": base64,
+}
+
+
+def convert_to_serializable(obj):
+    if isinstance(obj, (np.int64, np.int32)):
+        return int(obj)
+    if isinstance(obj, (np.float64, np.float32)):
+        return float(obj)
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def load_data(data_dir):
+    data = {}
+    for file_name in sorted(os.listdir(data_dir)):
+        if file_name.endswith(".arrow"):
+            data[file_name[:-len(".arrow")]] = pd.read_feather(os.path.join(data_dir, file_name))
+    return data
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but good enough to spot growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_job(job: dict) -> dict:
+    namespace = {"__name__": "__analyzer__", **PRELOADED}
+    try:
+        with matplotlib.rc_context():
+            exec(compile(job["code"], "<data_analyzer>", "exec"), namespace)
+            data = load_data(job["data_dir"])
+            return namespace["data_analyzer"](data)
+    except Exception as e:
+        traceback.print_exc()
+        return {
+            "error": f"Execution failed: {str(e)}",
+            "insights": [],
+            "chart": None,
+            "data": {}
+        }
+    finally:
+        plt.close("all")
+        namespace.clear()
+        gc.collect()
+
+
+def send(message: dict):
+    _protocol.write(json.dumps(message, default=convert_to_serializable) + "\n")
+    _protocol.flush()
+
+
+def main():
+    send({"ready": True, "rss": current_rss()})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        result = run_job(json.loads(line))
+        try:
+            send({"result": result, "rss": current_rss()})
+        except (TypeError, ValueError) as e:
+            send({
+                "result": {"error": f"Execution failed: {str(e)}", "insights": [], "chart": None, "data": {}},
+                "rss": current_rss()
+            })
+
+
+if __name__ == "__main__":
+    main()
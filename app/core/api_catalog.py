@@ -0,0 +1,103 @@
+from app.core.kusto_client import execute_kusto_query
+from app.core.single_flight import get_single_flight
+from app.config import get_settings
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+CatalogKey = Tuple[str, Optional[str]]
+
+
+class ApiCatalog:
+    """
+    In-memory catalog of (apiId, apiName) per organization and deployment.
+
+    Entries younger than the TTL are served directly. Older entries are still
+    served while a background refresh runs (stale-while-revalidate); entries
+    past the max staleness, or missing entirely, are fetched inline.
+    """
+
+    def __init__(self, ttl_seconds: int, max_stale_seconds: int):
+        self.ttl = ttl_seconds
+        self.max_stale = max_stale_seconds
+        self._entries: Dict[CatalogKey, Tuple[list, float]] = {}
+        self._refreshing = get_single_flight("api_catalog")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    async def get_apis(self, organization_id: str, environment_id: Optional[str] = None) -> list:
+        key = (organization_id, environment_id)
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry[1] if entry else None
+
+        if entry is None or age > self.ttl + self.max_stale:
+            self.misses += 1
+            return await self._refresh(key)
+
+        if age > self.ttl:
+            self.stale_hits += 1
+            self._refresh_in_background(key)
+        else:
+            self.hits += 1
+        return entry[0]
+
+    async def warm(self, organization_id: str, environment_id: Optional[str] = None):
+        await self._refresh((organization_id, environment_id))
+
+    def _refresh_in_background(self, key: CatalogKey):
+        if self._refreshing.in_flight(key):
+            return
+        task = asyncio.ensure_future(self._refresh(key))
+        # Failures are already logged and counted; keep serving the stale entry
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def _refresh(self, key: CatalogKey) -> list:
+        # Concurrent callers share a single in-flight catalog query per key
+        return await self._refreshing.do(key, lambda: self._load(key))
+
+    async def _load(self, key: CatalogKey) -> list:
+        organization_id, environment_id = key
+        query = f"""
+        analytics_response_code_summary
+        | where customerId == '{organization_id}'"""
+        if environment_id is not None:
+            query += f" and deploymentId == '{environment_id}'"
+        query += """
+        | summarize by apiId, apiName
+        """
+        logging.info(f"Refreshing API catalog for {key}")
+
+        self.refreshes += 1
+        try:
+            response = await execute_kusto_query(query)
+        except Exception as e:
+            self.refresh_errors += 1
+            logging.error(f"API catalog refresh failed for {key}: {e}")
+            raise
+
+        apis = [{"apiId": row["apiId"], "apiName": row["apiName"]}
+                for row in response.primary_results[0]]
+        self._entries[key] = (apis, time.monotonic())
+        logging.info(f"API catalog for {key} holds {len(apis)} APIs")
+        return apis
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+@lru_cache()
+def get_api_catalog() -> ApiCatalog:
+    settings = get_settings()
+    return ApiCatalog(settings.API_CATALOG_TTL_SECONDS, settings.API_CATALOG_MAX_STALE_SECONDS)
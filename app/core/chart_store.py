@@ -0,0 +1,135 @@
+from app.config import get_settings
+from functools import lru_cache
+from typing import Optional, Tuple
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+
+CHART_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def png_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    # Width and height are the first two fields of the IHDR chunk
+    if len(data) < 24 or not data.startswith(PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", data[16:24])
+
+
+class ChartStore:
+    """
+    Content-addressed store for chart PNGs.
+
+    A chart's ID is the SHA-256 of its bytes, so identical charts are stored
+    once and a stored file never changes. The oldest files are pruned when the
+    directory grows past the byte budget.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.pruned = 0
+
+    def save(self, chart_b64: str) -> Optional[dict]:
+        try:
+            data = base64.b64decode(chart_b64, validate=True)
+        except (binascii.Error, ValueError) as e:
+            logging.warning(f"Discarding chart that is not valid base64: {e}")
+            return None
+
+        chart_id = hashlib.sha256(data).hexdigest()
+        dimensions = png_dimensions(data)
+        meta = {
+            "id": chart_id,
+            "bytes": len(data),
+            "width": dimensions[0] if dimensions else None,
+            "height": dimensions[1] if dimensions else None,
+        }
+
+        path = os.path.join(self.directory, f"{chart_id}.png")
+        with self._lock:
+            if os.path.exists(path):
+                # Refresh the write time so pruning treats it as recently used
+                os.utime(path)
+                self.deduplicated += 1
+                return meta
+
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as chart_file:
+                chart_file.write(data)
+            os.replace(temp_path, path)
+            self.stored += 1
+
+            if self._bytes is None:
+                self._bytes = self._scan_bytes()
+            else:
+                self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._prune(keep=path)
+        return meta
+
+    def path_for(self, chart_id: str) -> Optional[str]:
+        if not CHART_ID_PATTERN.match(chart_id):
+            return None
+        path = os.path.join(self.directory, f"{chart_id}.png")
+        return path if os.path.exists(path) else None
+
+    def _chart_files(self):
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                yield entry
+
+    def _scan_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self._chart_files())
+
+    def _prune(self, keep: str):
+        # Drop the least recently written charts until we are back under 90% of the budget
+        files = sorted(self._chart_files(), key=lambda entry: entry.stat().st_mtime)
+        for entry in files:
+            if self._bytes <= self.max_bytes * 0.9:
+                break
+            if entry.path == keep:
+                continue
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._bytes -= size
+            self.pruned += 1
+
+    def stats(self) -> dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "pruned": self.pruned,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def describe_chart(meta: Optional[dict], description: Optional[str]) -> str:
+    """Compact stand-in for the chart in the summary prompt."""
+    if meta is None:
+        return "No chart was generated."
+    size = f"{meta['width']}x{meta['height']} " if meta.get("width") else ""
+    text = f"A {size}PNG chart was generated and is shown to the user below the answer."
+    if description:
+        text += f" Chart description: {description}"
+    return text
+
+
+@lru_cache()
+def get_chart_store() -> ChartStore:
+    settings = get_settings()
+    return ChartStore(settings.CHART_STORE_DIR, settings.CHART_STORE_MAX_BYTES)
@@ -0,0 +1,116 @@
+from app.config import get_settings
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+SCHEMA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "schemas"))
+
+
+def normalize_query(user_query: str) -> str:
+    # Case, punctuation and spacing differences shouldn't produce a different analyzer
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", user_query.lower()).split())
+
+
+def schema_fingerprint(schema_dir: str = SCHEMA_DIR) -> str:
+    digest = hashlib.sha256()
+    for schema_path in sorted(glob.glob(os.path.join(schema_dir, "*_schema.json"))):
+        digest.update(os.path.basename(schema_path).encode("utf-8"))
+        with open(schema_path, "rb") as schema_file:
+            digest.update(schema_file.read())
+    return digest.hexdigest()
+
+
+class CodeCache:
+    """
+    LRU cache of generated data_analyzer code, persisted to a JSON file.
+
+    Keys combine the normalized user query, the selected tools and a
+    fingerprint of the schema files, so a schema change invalidates every
+    entry. Only code that ran successfully should be stored.
+    """
+
+    def __init__(self, path: str, max_entries: int, fingerprint: str):
+        self.path = path
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._write_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._load()
+
+    def make_key(self, user_query: str, selected_tools: List[str]) -> str:
+        return json.dumps([normalize_query(user_query), sorted(selected_tools), self.fingerprint])
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry["code"]
+
+    async def put(self, key: str, code: str):
+        self._entries[key] = {"code": code, "stored_at": time.time()}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.stores += 1
+
+        async with self._write_lock:
+            snapshot = {"fingerprint": self.fingerprint, "entries": list(self._entries.items())}
+            await asyncio.to_thread(self._save, snapshot)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                snapshot = json.load(cache_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable code cache {self.path}: {e}")
+            return
+
+        if snapshot.get("fingerprint") != self.fingerprint:
+            logging.info("Schemas changed since the code cache was written, starting empty")
+            return
+        for key, entry in snapshot.get("entries", [])[-self.max_entries:]:
+            self._entries[key] = entry
+        logging.info(f"Loaded {len(self._entries)} cached analyzers from {self.path}")
+
+    def _save(self, snapshot: dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(snapshot, cache_file)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not persist code cache to {self.path}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+        }
+
+
+@lru_cache()
+def get_code_cache() -> CodeCache:
+    settings = get_settings()
+    return CodeCache(settings.CODE_CACHE_PATH, settings.CODE_CACHE_MAX_ENTRIES, schema_fingerprint())
@@ -0,0 +1,63 @@
+from azure.kusto.data.helpers import dataframe_from_result_table
+from typing import Dict, List, Optional
+import pandas as pd
+
+TIME_COLUMN = "AGG_WINDOW_START_TIME"
+
+# Low-cardinality string columns are dictionary encoded instead of repeating
+# the same strings on every bucket.
+CATEGORICAL_COLUMNS = ("bucketSize", "apiName", "errorType", "errorMessage", "proxyResponseCode", "deploymentId")
+
+# Plain numpy dtypes rather than the nullable extension types the Kusto helper defaults to
+_CONVERTERS_BY_TYPE = {
+    "int": lambda col, df: pd.to_numeric(df[col]).fillna(0).astype("int64"),
+    "long": lambda col, df: pd.to_numeric(df[col]).fillna(0).astype("int64"),
+    "real": lambda col, df: pd.to_numeric(df[col], errors="coerce").astype("float64"),
+    "double": lambda col, df: pd.to_numeric(df[col], errors="coerce").astype("float64"),
+    "decimal": lambda col, df: pd.to_numeric(df[col], errors="coerce").astype("float64"),
+}
+
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    if TIME_COLUMN in frame.columns:
+        frame[TIME_COLUMN] = pd.to_datetime(frame[TIME_COLUMN], utc=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in frame.columns and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype("category")
+    return frame
+
+
+def frame_from_result_table(results, columns: List[str], renames: Optional[Dict[str, str]] = None,
+                            bucket_size: Optional[str] = None) -> pd.DataFrame:
+    """Build a typed, columnar frame holding `columns` from a Kusto result table."""
+    renames = renames or {}
+    if results is None or len(results) == 0:
+        frame = pd.DataFrame(columns=columns)
+    else:
+        frame = dataframe_from_result_table(results, converters_by_type=_CONVERTERS_BY_TYPE)
+        frame = frame.rename(columns=renames)
+
+    if bucket_size is not None:
+        frame["bucketSize"] = bucket_size
+    return normalize_frame(frame[columns].copy())
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate frames in time order, keeping dictionary encoding and dtypes."""
+    non_empty = [frame for frame in frames if len(frame)]
+    if not non_empty:
+        return frames[0].iloc[0:0].copy()
+    if len(non_empty) == 1:
+        frame = non_empty[0].copy()
+    else:
+        frame = pd.concat(non_empty, ignore_index=True)
+    frame = normalize_frame(frame)
+    if TIME_COLUMN in frame.columns:
+        frame = frame.sort_values(TIME_COLUMN, kind="stable", ignore_index=True)
+    return frame
+
+
+def frame_size(frame: Optional[pd.DataFrame]) -> int:
+    if frame is None:
+        return 0
+    return int(frame.memory_usage(deep=True).sum())
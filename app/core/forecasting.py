@@ -0,0 +1,246 @@
+from app.config import get_settings
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import itertools
+import logging
+import numpy as np
+import threading
+
+METHODS = ("linear", "ewma", "holt_winters")
+
+# Observations per season for each bucket size; other sizes get no seasonal model
+SEASON_LENGTHS = {"1h": 24, "1d": 7}
+
+# Smoothing parameters tried when fitting; every combination is fitted at once
+EWMA_ALPHAS = np.linspace(0.05, 0.95, 19)
+HW_GRID = np.array(list(itertools.product(
+    (0.1, 0.2, 0.3, 0.5, 0.7, 0.9),  # level
+    (0.0, 0.02, 0.05, 0.1, 0.2),  # trend
+    (0.05, 0.1, 0.2, 0.4, 0.6),  # season
+)))
+
+# z-score of the 95% prediction interval
+INTERVAL_Z = 1.96
+
+
+@dataclass(frozen=True)
+class FittedModel:
+    """A model fitted to one series; `forecast` extends it `horizon` buckets past its end."""
+    method: str
+    params: Dict[str, float]
+    residual_std: float
+    state: Dict[str, np.ndarray] = field(compare=False)
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        steps = np.arange(1, horizon + 1)
+        if self.method == "linear":
+            return self.state["intercept"] + self.state["slope"] * (self.state["length"] - 1 + steps)
+        if self.method == "ewma":
+            return np.full(horizon, float(self.state["level"]))
+        season = self.state["season"]
+        positions = (self.state["length"] + steps - 1) % len(season)
+        return self.state["level"] + steps * self.state["trend"] + season[positions]
+
+    def spread(self, horizon: int) -> np.ndarray:
+        """Standard error of each forecast step, from the one-step residuals."""
+        steps = np.arange(horizon)
+        if self.method == "linear":
+            return np.full(horizon, self.residual_std)
+        # Errors of the smoothed level (and trend) carry over to later steps
+        alpha, beta = self.params["alpha"], self.params.get("beta", 0.0)
+        carried = np.cumsum((alpha * (1 + steps * beta)) ** 2) - alpha ** 2
+        return self.residual_std * np.sqrt(1 + carried)
+
+
+@dataclass(frozen=True)
+class Forecast:
+    method: str
+    params: Dict[str, float]
+    values: List[float]
+    lower: List[float]
+    upper: List[float]
+    cached: bool
+
+
+def fit_linear(values: np.ndarray) -> FittedModel:
+    positions = np.arange(len(values))
+    slope, intercept = np.polyfit(positions, values, 1) if len(values) > 1 else (0.0, float(values[0]))
+    residuals = values - (intercept + slope * positions)
+    return FittedModel(
+        "linear", {"slope": float(slope)}, float(np.std(residuals)),
+        {"intercept": float(intercept), "slope": float(slope), "length": len(values)}
+    )
+
+
+def fit_ewma(values: np.ndarray) -> FittedModel:
+    # One pass over the series updates the level for every candidate alpha
+    alphas = EWMA_ALPHAS
+    level = np.full(len(alphas), values[0], dtype=float)
+    sse = np.zeros(len(alphas))
+    for value in values[1:]:
+        error = value - level
+        sse += error ** 2
+        level += alphas * error
+    best = int(np.argmin(sse))
+    residual_std = float(np.sqrt(sse[best] / max(len(values) - 1, 1)))
+    return FittedModel("ewma", {"alpha": float(alphas[best])}, residual_std, {"level": float(level[best])})
+
+
+def fit_holt_winters(values: np.ndarray, season_length: int) -> FittedModel:
+    """Additive Holt-Winters, fitted for the whole parameter grid in one pass over the series."""
+    alpha, beta, gamma = HW_GRID[:, 0], HW_GRID[:, 1], HW_GRID[:, 2]
+    first, second = values[:season_length], values[season_length:2 * season_length]
+    level = np.full(len(HW_GRID), first.mean())
+    trend = np.full(len(HW_GRID), (second.mean() - first.mean()) / season_length)
+    season = np.tile(first - first.mean(), (len(HW_GRID), 1))
+    sse = np.zeros(len(HW_GRID))
+
+    for t, value in enumerate(values):
+        position = t % season_length
+        error = value - (level + trend + season[:, position])
+        # The first season only initializes the model
+        if t >= season_length:
+            sse += error ** 2
+        new_level = alpha * (value - season[:, position]) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, position] = gamma * (value - new_level) + (1 - gamma) * season[:, position]
+        level = new_level
+
+    best = int(np.argmin(sse))
+    residual_std = float(np.sqrt(sse[best] / max(len(values) - season_length, 1)))
+    # Seasonal components stay indexed by position in the season, counted from the first bucket
+    return FittedModel(
+        "holt_winters",
+        {"alpha": float(alpha[best]), "beta": float(beta[best]), "gamma": float(gamma[best]),
+         "season_length": season_length},
+        residual_std,
+        {"level": float(level[best]), "trend": float(trend[best]), "season": season[best].copy(),
+         "length": len(values)}
+    )
+
+
+def fit(method: str, values: np.ndarray, season_length: Optional[int]) -> FittedModel:
+    if method == "linear":
+        return fit_linear(values)
+    if method == "ewma":
+        return fit_ewma(values)
+    return fit_holt_winters(values, season_length)
+
+
+def candidate_methods(length: int, season_length: Optional[int]) -> List[str]:
+    methods = ["linear", "ewma"]
+    if season_length and length >= 2 * season_length + 1:
+        methods.append("holt_winters")
+    return methods
+
+
+def select_method(values: np.ndarray, season_length: Optional[int], horizon: int) -> str:
+    """Pick the method with the lowest error on the last buckets when fitted without them."""
+    holdout = min(horizon, max(len(values) // 5, 1))
+    training = values[:-holdout]
+    methods = candidate_methods(len(training), season_length)
+    if len(training) < 3:
+        return "ewma"
+    errors = {
+        method: float(np.mean(np.abs(fit(method, training, season_length).forecast(holdout) - values[-holdout:])))
+        for method in methods
+    }
+    return min(errors, key=errors.get)
+
+
+def series_fingerprint(values: np.ndarray, end: str) -> str:
+    return hashlib.sha1(values.tobytes() + end.encode("utf-8")).hexdigest()
+
+
+class Forecaster:
+    """
+    Forecasts bucketed series (hits, errors, latency per bucket) in-process
+    with a linear trend, an EWMA baseline or additive Holt-Winters.
+
+    Fitted models are kept per (api, metric, granularity) together with a
+    fingerprint of the series they were fitted on, so asking again about the
+    same data, e.g. with another horizon, reuses the model. Forecasts run in
+    worker threads; the model cache and counters are guarded by a lock, the
+    fitting itself runs outside it.
+    """
+
+    def __init__(self, max_entries: int, max_horizon: int):
+        self.max_entries = max_entries
+        self.max_horizon = max_horizon
+        self._models: "OrderedDict[Tuple[str, str, str], Tuple[str, FittedModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.fits = 0
+        self.hits = 0
+        self.methods: Dict[str, int] = {}
+
+    def forecast(self, key: Tuple[str, str, str], values: np.ndarray, end: str, horizon: int,
+                 method: str = "auto", non_negative: bool = True) -> Forecast:
+        """
+        Forecast `horizon` buckets past the end of `values`, one value per
+        bucket of the granularity in `key` (api, metric, granularity). `end`
+        identifies the last bucket so a model is only reused for the same
+        series.
+        """
+        if method != "auto" and method not in METHODS:
+            raise ValueError(f"Unknown forecasting method {method}")
+        horizon = max(1, min(horizon, self.max_horizon))
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            raise ValueError("Cannot forecast an empty series")
+        season_length = SEASON_LENGTHS.get(key[2])
+        if method == "holt_winters" and "holt_winters" not in candidate_methods(len(values), season_length):
+            raise ValueError(f"Holt-Winters needs at least two seasons of {key[2]} buckets")
+
+        fingerprint = f"{method}:{series_fingerprint(values, end)}"
+        with self._lock:
+            entry = self._models.get(key)
+            cached = entry is not None and entry[0] == fingerprint
+            if cached:
+                self._models.move_to_end(key)
+                self.hits += 1
+                model = entry[1]
+
+        if not cached:
+            chosen = select_method(values, season_length, horizon) if method == "auto" else method
+            model = fit(chosen, values, season_length)
+            with self._lock:
+                self.fits += 1
+                self.methods[model.method] = self.methods.get(model.method, 0) + 1
+                self._models[key] = (fingerprint, model)
+                self._models.move_to_end(key)
+                while len(self._models) > self.max_entries:
+                    self._models.popitem(last=False)
+            logging.info(f"Fitted {model.method} forecast for {key} on {len(values)} buckets")
+
+        predicted = model.forecast(horizon)
+        spread = INTERVAL_Z * model.spread(horizon)
+        lower, upper = predicted - spread, predicted + spread
+        if non_negative:
+            predicted, lower, upper = np.maximum(predicted, 0), np.maximum(lower, 0), np.maximum(upper, 0)
+        return Forecast(
+            method=model.method,
+            params=model.params,
+            values=[round(float(value), 3) for value in predicted],
+            lower=[round(float(value), 3) for value in lower],
+            upper=[round(float(value), 3) for value in upper],
+            cached=cached,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "max_entries": self.max_entries,
+                "fits": self.fits,
+                "hits": self.hits,
+                "methods": dict(self.methods),
+            }
+
+
+@lru_cache()
+def get_forecaster() -> Forecaster:
+    settings = get_settings()
+    return Forecaster(max_entries=settings.FORECAST_CACHE_MAX_ENTRIES, max_horizon=settings.FORECAST_MAX_HORIZON)
@@ -0,0 +1,478 @@
+from app.config import get_settings
+from app.core.dataset import TIME_COLUMN
+from app.core.forecasting import SEASON_LENGTHS, get_forecaster
+from app.utils.query_helper import TimeBucket, bucket_starts, bucket_window, forecast_bucket, to_utc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from matplotlib.figure import Figure
+from typing import Callable, Dict, List, Optional, Union
+import base64
+import math
+import io
+import logging
+import numpy as np
+import pandas as pd
+import re
+
+TRAFFIC_TOOL = "traffic_data_tool"
+ERROR_TOOL = "error_data_tool"
+LATENCY_TOOL = "latency_data_tool"
+
+# Questions the fixed analyses cannot answer well; they always go to code generation
+UNSUPPORTED = re.compile(
+    r"\b(correlat\w*|compar\w*|vs\.?|versus|why|cause\w*|anomal\w*|relationship|impact|heat ?map|per minute)\b",
+    re.IGNORECASE
+)
+
+# Questions asking for future values; answered by the forecasting module
+PREDICTION = re.compile(
+    r"\b(predict\w*|forecast\w*|future|projections?|tomorrow|upcoming|next \d* ?(hour|day|week|month)s?)\b",
+    re.IGNORECASE
+)
+HORIZON = re.compile(r"\b(?:next|coming|following)\s+(\d+)?\s*(hour|day|week|month)s?\b", re.IGNORECASE)
+HORIZON_UNITS = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(days=7), "month": timedelta(days=30)}
+
+# Distinct series shown in stacked charts before the rest is folded into "Other"
+MAX_CHART_SERIES = 6
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A question shape answered by a built-in analysis of one tool's data."""
+    name: str
+    tool: str
+    pattern: "re.Pattern"
+    analyze: Callable[[pd.DataFrame, pd.DatetimeIndex, str], dict]
+
+
+@dataclass(frozen=True)
+class ForecastIntent:
+    """A prediction question: one metric of one tool's data, forecast per bucket."""
+    name: str
+    tool: str
+    metric: str
+    unit: str
+    series: Callable[[pd.DataFrame, pd.DatetimeIndex], pd.Series]
+
+
+def time_label(timestamp: pd.Timestamp, bucket_label: str) -> str:
+    if bucket_label == "1h":
+        return timestamp.strftime("%Y-%m-%d %H:%M")
+    if bucket_label == "1mo":
+        return timestamp.strftime("%Y-%m")
+    return timestamp.strftime("%Y-%m-%d")
+
+
+def bucket_name(bucket_label: str) -> str:
+    return {"1h": "hour", "1d": "day", "1mo": "month"}.get(bucket_label, f"{bucket_label[:-1]}-day period")
+
+
+def share(part: float, total: float) -> float:
+    return float(part / total) if total else 0.0
+
+
+def align_to_buckets(frame: pd.DataFrame, index: pd.DatetimeIndex) -> pd.DataFrame:
+    # Results are summarized per bucket already; this only guards against
+    # timestamps that are not exact bucket starts
+    positions = index.searchsorted(frame[TIME_COLUMN], side="right") - 1
+    inside = positions >= 0
+    return frame[inside].assign(**{TIME_COLUMN: index[positions[inside]]})
+
+
+def per_bucket(frame: pd.DataFrame, value: str, index: pd.DatetimeIndex) -> pd.Series:
+    # Buckets missing from the result had no hits, so they count as zero
+    return frame.groupby(TIME_COLUMN, observed=True)[value].sum().reindex(index, fill_value=0)
+
+
+def per_bucket_by(frame: pd.DataFrame, column: str, value: str, index: pd.DatetimeIndex) -> pd.DataFrame:
+    table = frame.pivot_table(index=TIME_COLUMN, columns=column, values=value, aggfunc="sum", observed=True)
+    table = table.reindex(index, fill_value=0).fillna(0)
+    # Keep the largest series and fold the rest into "Other"
+    order = table.sum().sort_values(ascending=False).index
+    if len(order) > MAX_CHART_SERIES:
+        kept = list(order[:MAX_CHART_SERIES - 1])
+        table = pd.concat([table[kept], table.drop(columns=kept).sum(axis=1).rename("Other")], axis=1)
+    else:
+        table = table[list(order)]
+    table.columns = [str(column) for column in table.columns]
+    return table
+
+
+def hit_weighted(frame: pd.DataFrame, value: str, index: pd.DatetimeIndex) -> pd.Series:
+    # Per-API p95 values cannot be merged exactly, so buckets use the
+    # hit-weighted average; buckets without hits stay NaN
+    weighted = frame.assign(weight=frame[value] * frame["hitCount"])
+    grouped = weighted.groupby(TIME_COLUMN, observed=True)[["weight", "hitCount"]].sum().reindex(index)
+    return grouped["weight"] / grouped["hitCount"].replace(0, np.nan)
+
+
+def totals_by(frame: pd.DataFrame, column: str, value: str, limit: Optional[int] = None) -> Dict[str, int]:
+    totals = frame.groupby(column, observed=True)[value].sum().sort_values(ascending=False)
+    if limit is not None:
+        totals = totals.head(limit)
+    return {str(key): int(count) for key, count in totals.items()}
+
+
+def bar_chart(series: pd.DataFrame, bucket_label: str, title: str, ylabel: str, stacked: bool = False) -> str:
+    """Bar chart of `series` (one column per series) as a base64 PNG."""
+    # The Figure API keeps no global state, so charts can be drawn from worker threads
+    figure = Figure(figsize=(12, 6))
+    axes = figure.subplots()
+    labels = [time_label(timestamp, bucket_label) for timestamp in series.index]
+    positions = np.arange(len(labels))
+
+    if stacked or len(series.columns) == 1:
+        bottom = np.zeros(len(labels))
+        for column in series.columns:
+            values = series[column].to_numpy(dtype=float)
+            axes.bar(positions, values, bottom=bottom if stacked else None, label=column)
+            if stacked:
+                bottom = bottom + np.nan_to_num(values)
+    else:
+        width = 0.8 / len(series.columns)
+        for offset, column in enumerate(series.columns):
+            axes.bar(positions + offset * width - 0.4 + width / 2, series[column].to_numpy(dtype=float), width, label=column)
+
+    # Thin out the tick labels so long ranges stay readable
+    step = max(len(labels) // 24, 1)
+    axes.set_xticks(positions[::step])
+    axes.set_xticklabels(labels[::step], rotation=45, ha="right")
+    axes.set_title(title)
+    axes.set_ylabel(ylabel)
+    if len(series.columns) > 1:
+        axes.legend()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", bbox_inches="tight")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def result(insights: List[str], chart: Optional[str], chart_description: Optional[str], data: dict) -> dict:
+    return {"error": None, "insights": insights, "chart": chart, "chart_description": chart_description, "data": data}
+
+
+def analyze_traffic(frame: pd.DataFrame, index: pd.DatetimeIndex, bucket_label: str) -> dict:
+    hits = per_bucket(frame, "totalHits", index)
+    total = int(hits.sum())
+    average = float(hits.mean())
+    by_api = totals_by(frame, "apiName", "totalHits")
+    unit = bucket_name(bucket_label)
+
+    insights = [
+        f"Total hits from {time_label(index[0], bucket_label)} to {time_label(index[-1], bucket_label)}: {total:,}",
+        f"Average hits per {unit}: {average:,.1f} over {len(index)} {unit}s",
+    ]
+    if total:
+        insights.append(f"Busiest {unit}: {time_label(hits.idxmax(), bucket_label)} with {int(hits.max()):,} hits")
+        insights.append(f"Quietest {unit}: {time_label(hits.idxmin(), bucket_label)} with {int(hits.min()):,} hits")
+    if len(by_api) > 1:
+        api, count = next(iter(by_api.items()))
+        insights.append(f"Most called API: {api} with {count:,} hits ({share(count, total):.1%} of all traffic)")
+
+    chart = bar_chart(hits.to_frame("hits"), bucket_label, f"Hits per {unit}", "Hits")
+    return result(insights, chart, f"Bar chart of total hits per {unit}", {
+        "total_hits": total,
+        "average_hits_per_bucket": round(average, 2),
+        "bucket_size": bucket_label,
+        "hits_per_bucket": {time_label(timestamp, bucket_label): int(value) for timestamp, value in hits.items()},
+        "hits_by_api": by_api,
+    })
+
+
+def analyze_errors(frame: pd.DataFrame, index: pd.DatetimeIndex, bucket_label: str) -> dict:
+    errors = per_bucket(frame, "hitCount", index)
+    total = int(errors.sum())
+    by_type = totals_by(frame, "errorType", "hitCount")
+    by_message = totals_by(frame, "errorMessage", "hitCount", limit=5)
+    by_api = totals_by(frame, "apiName", "hitCount", limit=5)
+    unit = bucket_name(bucket_label)
+
+    insights = [f"Total errors: {total:,}, {float(errors.mean()):,.1f} per {unit} on average"]
+    insights.extend(f"{error_type}: {count:,} errors ({share(count, total):.1%})" for error_type, count in by_type.items())
+    if by_message:
+        message, count = next(iter(by_message.items()))
+        insights.append(f"Most frequent error message: '{message}' ({count:,} times)")
+    if len(by_api) > 1:
+        api, count = next(iter(by_api.items()))
+        insights.append(f"API with the most errors: {api} ({count:,}, {share(count, total):.1%})")
+    if total:
+        insights.append(f"Most errors in the {unit} of {time_label(errors.idxmax(), bucket_label)}: {int(errors.max()):,}")
+
+    by_type_per_bucket = per_bucket_by(frame, "errorType", "hitCount", index)
+    chart = bar_chart(by_type_per_bucket, bucket_label, f"Errors per {unit} by error type", "Errors", stacked=True)
+    return result(insights, chart, f"Stacked bar chart of errors per {unit}, split by error type", {
+        "total_errors": total,
+        "average_errors_per_bucket": round(float(errors.mean()), 2),
+        "bucket_size": bucket_label,
+        "errors_by_type": by_type,
+        "top_error_messages": by_message,
+        "errors_by_api": by_api,
+        "errors_per_bucket": {time_label(timestamp, bucket_label): int(value) for timestamp, value in errors.items()},
+    })
+
+
+def analyze_latency(frame: pd.DataFrame, index: pd.DatetimeIndex, bucket_label: str) -> dict:
+    # APIs and the whole period use the hit-weighted average of p95 as well
+    weighted = frame.assign(
+        p95_weight=frame["latency"] * frame["hitCount"],
+        avg_weight=frame["avgLatency"] * frame["hitCount"],
+    )
+    p95 = hit_weighted(frame, "latency", index)
+    average = hit_weighted(frame, "avgLatency", index)
+
+    total_hits = float(weighted["hitCount"].sum())
+    overall_p95 = float(weighted["p95_weight"].sum() / total_hits) if total_hits else float(frame["latency"].mean())
+    overall_avg = float(weighted["avg_weight"].sum() / total_hits) if total_hits else float(frame["avgLatency"].mean())
+    unit = bucket_name(bucket_label)
+
+    by_api = weighted.groupby("apiName", observed=True)[["p95_weight", "hitCount"]].sum()
+    by_api = (by_api["p95_weight"] / by_api["hitCount"].replace(0, np.nan)).dropna().sort_values(ascending=False).head(5)
+
+    insights = [
+        f"p95 latency over the period: {overall_p95:,.1f} ms (hit-weighted across APIs)",
+        f"Average latency over the period: {overall_avg:,.1f} ms",
+    ]
+    measured = p95.dropna()
+    if len(measured):
+        insights.append(f"Highest p95 in the {unit} of {time_label(measured.idxmax(), bucket_label)}: {float(measured.max()):,.1f} ms")
+        insights.append(f"Lowest p95 in the {unit} of {time_label(measured.idxmin(), bucket_label)}: {float(measured.min()):,.1f} ms")
+    trend = None
+    if len(measured) >= 2:
+        # Change per bucket from a least-squares line through the measured buckets
+        positions = np.flatnonzero(p95.notna().to_numpy())
+        trend = float(np.polyfit(positions, measured.to_numpy(dtype=float), 1)[0])
+        direction = "rising" if trend > 0 else "falling" if trend < 0 else "flat"
+        insights.append(f"p95 latency is {direction} by about {abs(trend):,.2f} ms per {unit}")
+    if len(by_api) > 1:
+        insights.append(f"Slowest API: {by_api.index[0]} with a p95 of {float(by_api.iloc[0]):,.1f} ms")
+
+    chart = bar_chart(p95.to_frame("p95 latency"), bucket_label, f"p95 latency per {unit}", "Latency (ms)")
+    return result(insights, chart, f"Bar chart of hit-weighted p95 latency per {unit} in ms", {
+        "p95_latency_ms": round(overall_p95, 2),
+        "average_latency_ms": round(overall_avg, 2),
+        "trend_ms_per_bucket": round(trend, 3) if trend is not None else None,
+        "bucket_size": bucket_label,
+        "p95_per_bucket": {time_label(timestamp, bucket_label): round(float(value), 2)
+                           for timestamp, value in p95.items() if not np.isnan(value)},
+        "average_per_bucket": {time_label(timestamp, bucket_label): round(float(value), 2)
+                               for timestamp, value in average.items() if not np.isnan(value)},
+        "p95_by_api": {str(api): round(float(value), 2) for api, value in by_api.items()},
+    })
+
+
+def analyze_status_codes(frame: pd.DataFrame, index: pd.DatetimeIndex, bucket_label: str) -> dict:
+    by_code = totals_by(frame, "proxyResponseCode", "totalHits")
+    total = sum(by_code.values())
+    classes = frame.assign(statusClass=frame["proxyResponseCode"].astype(str).str[0] + "xx")
+    by_class = totals_by(classes, "statusClass", "totalHits")
+    client_errors, server_errors = by_class.get("4xx", 0), by_class.get("5xx", 0)
+    unit = bucket_name(bucket_label)
+
+    insights = [f"{total:,} responses across {len(by_code)} status codes"]
+    insights.extend(f"{status_class}: {count:,} ({share(count, total):.1%})" for status_class, count in by_class.items())
+    insights.append(f"Error rate (4xx and 5xx): {share(client_errors + server_errors, total):.2%}")
+    insights.extend(f"Status {code}: {count:,} ({share(count, total):.1%})" for code, count in list(by_code.items())[:5])
+
+    by_class_per_bucket = per_bucket_by(classes, "statusClass", "totalHits", index)
+    chart = bar_chart(by_class_per_bucket, bucket_label, f"Responses per {unit} by status class", "Responses", stacked=True)
+    return result(insights, chart, f"Stacked bar chart of responses per {unit}, split by status class (2xx, 4xx, 5xx...)", {
+        "total_responses": total,
+        "bucket_size": bucket_label,
+        "responses_by_code": by_code,
+        "responses_by_class": by_class,
+        "error_rate": round(share(client_errors + server_errors, total), 4),
+        "server_error_rate": round(share(server_errors, total), 4),
+    })
+
+
+def parse_horizon(user_query: str, bucket: TimeBucket) -> int:
+    """Buckets to forecast: the span the question asks about ("next 3 days"), else one season."""
+    found = HORIZON.search(user_query)
+    if found is not None:
+        span = int(found.group(1) or 1) * HORIZON_UNITS[found.group(2).lower()]
+    elif re.search(r"\btomorrow\b", user_query, re.IGNORECASE):
+        span = timedelta(days=1)
+    else:
+        return SEASON_LENGTHS.get(bucket.label, 7)
+    return max(math.ceil(span / bucket.span), 1)
+
+
+def describe_method(method: str, params: dict, unit: str) -> str:
+    if method == "holt_winters":
+        return f"seasonal Holt-Winters with a {params['season_length']}-{unit} season"
+    if method == "linear":
+        return f"a linear trend ({params['slope']:+,.2f} per {unit})"
+    return f"an exponentially weighted baseline (alpha {params['alpha']:.2f})"
+
+
+def analyze_forecast(intent: ForecastIntent, frame: pd.DataFrame, index: pd.DatetimeIndex, bucket: TimeBucket,
+                     api_name: str, horizon: int, observed_until: datetime) -> dict:
+    observed = intent.series(frame, index)
+    # Buckets still in progress (or in the future) would drag the forecast down
+    closed = [bucket.next(timestamp.to_pydatetime()) <= observed_until for timestamp in observed.index]
+    observed = observed[closed] if any(closed) else observed.iloc[:1]
+    if observed.isna().all():
+        return result([f"No {intent.metric} data to forecast"], None, None, {})
+    history = observed.interpolate(limit_direction="both")
+
+    forecast = get_forecaster().forecast(
+        (api_name, intent.metric, bucket.label), history.to_numpy(dtype=float), str(history.index[-1]), horizon
+    )
+    future = [bucket.next(history.index[-1].to_pydatetime())]
+    while len(future) < len(forecast.values):
+        future.append(bucket.next(future[-1]))
+    future_index = pd.DatetimeIndex(future, name=TIME_COLUMN)
+    unit = bucket_name(bucket.label)
+    steps = len(forecast.values)
+    first, last = time_label(future_index[0], bucket.label), time_label(future_index[-1], bucket.label)
+
+    insights = [f"Forecast of {intent.metric} per {unit} for the next {steps} {unit}s ({first} to {last}) "
+                f"using {describe_method(forecast.method, forecast.params, unit)}, fitted on {len(history)} {unit}s"]
+    insights.append(f"Next {unit} ({first}): {forecast.values[0]:,.1f} {intent.unit} "
+                    f"(95% range {forecast.lower[0]:,.1f} to {forecast.upper[0]:,.1f})")
+    recent = float(history.iloc[-steps:].mean())
+    expected = float(np.mean(forecast.values))
+    if intent.unit == "ms":
+        insights.append(f"Expected average over the horizon: {expected:,.1f} ms against {recent:,.1f} ms recently")
+    else:
+        insights.append(f"Expected total over the next {steps} {unit}s: about {sum(forecast.values):,.0f} {intent.unit}")
+    if recent:
+        insights.append(f"That is {share(expected - recent, recent):+.1%} per {unit} compared with the last {steps} observed {unit}s")
+    peak = int(np.argmax(forecast.values))
+    if max(forecast.values) > min(forecast.values):
+        insights.append(f"Highest forecast {unit}: {time_label(future_index[peak], bucket.label)} "
+                        f"with {forecast.values[peak]:,.1f} {intent.unit}")
+
+    chart_data = pd.concat([
+        history.rename("observed").to_frame(),
+        pd.Series(forecast.values, index=future_index, name="forecast").to_frame(),
+    ])
+    chart = bar_chart(chart_data, bucket.label, f"{intent.metric.capitalize()} per {unit}: observed and forecast",
+                      intent.unit.capitalize(), stacked=True)
+    return result(insights, chart, f"Bar chart of observed {intent.metric} per {unit} followed by the forecast", {
+        "metric": intent.metric,
+        "bucket_size": bucket.label,
+        "horizon": steps,
+        "method": forecast.method,
+        "params": forecast.params,
+        "observed": {time_label(timestamp, bucket.label): round(float(value), 2) for timestamp, value in observed.items()
+                     if not np.isnan(value)},
+        "forecast": {
+            time_label(timestamp, bucket.label): {"value": value, "lower": lower, "upper": upper}
+            for timestamp, value, lower, upper in zip(future_index, forecast.values, forecast.lower, forecast.upper)
+        },
+    })
+
+
+# Checked in order; traffic is the generic shape and only applies when nothing more specific does
+INTENTS = [
+    Intent("status_codes", TRAFFIC_TOOL, re.compile(
+        r"\b(status|response|http|return)[ -]?codes?\b|\b[1-5]xx\b|\bstatus(es)?\b", re.IGNORECASE), analyze_status_codes),
+    Intent("error_breakdown", ERROR_TOOL, re.compile(
+        r"\berrors?\b|\bfail(ures?|ed|ing|s)?\b|\bexceptions?\b", re.IGNORECASE), analyze_errors),
+    Intent("latency_trend", LATENCY_TOOL, re.compile(
+        r"\blatenc(y|ies)\b|\bresponse[ -]times?\b|\bslow(est|er|ness)?\b|\bp9[059]\b|\bpercentiles?\b", re.IGNORECASE),
+        analyze_latency),
+]
+TRAFFIC_INTENT = Intent("traffic_volume", TRAFFIC_TOOL, re.compile(
+    r"\btraffic\b|\bhits?\b|\brequests?\b|\bcalls?\b|\busage\b|\bvolume\b|\bthroughput\b|\bhow many\b|\bbusiest\b",
+    re.IGNORECASE), analyze_traffic)
+
+# The metric forecast for each question shape; status codes have none
+FORECASTS = {
+    "traffic_volume": ForecastIntent("forecast_traffic", TRAFFIC_TOOL, "hits", "hits",
+                                     lambda frame, index: per_bucket(frame, "totalHits", index).astype(float)),
+    "error_breakdown": ForecastIntent("forecast_errors", ERROR_TOOL, "errors", "errors",
+                                      lambda frame, index: per_bucket(frame, "hitCount", index).astype(float)),
+    "latency_trend": ForecastIntent("forecast_latency", LATENCY_TOOL, "p95 latency", "ms",
+                                    lambda frame, index: hit_weighted(frame, "latency", index)),
+}
+INTENT_FOR_TOOL = {TRAFFIC_TOOL: "traffic_volume", ERROR_TOOL: "error_breakdown", LATENCY_TOOL: "latency_trend"}
+
+
+class InsightEngine:
+    """
+    Answers the common question shapes (traffic volume, error breakdown,
+    latency trend, status codes) with vectorized pandas analyses of the tool
+    data, returning the same {error, insights, chart, data} result as the
+    generated analyzer. Prediction questions about one of them are answered
+    by the forecasting module. Questions that do not clearly map to one of
+    them are left to code generation.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+        self.failures = 0
+
+    def match(self, user_query: str, tool_keys: List[str]) -> Optional[Union[Intent, ForecastIntent]]:
+        if not self.enabled:
+            return None
+        if UNSUPPORTED.search(user_query):
+            self.fallbacks += 1
+            return None
+
+        matches = [intent for intent in INTENTS if intent.pattern.search(user_query)]
+        if not matches and TRAFFIC_INTENT.pattern.search(user_query):
+            matches = [TRAFFIC_INTENT]
+        predicting = PREDICTION.search(user_query) is not None
+        # "What will next week look like?" names no metric; forecast the one tool selected
+        if not matches and predicting and len(tool_keys) == 1 and tool_keys[0] in INTENT_FOR_TOOL:
+            matches = [intent for intent in INTENTS + [TRAFFIC_INTENT] if intent.name == INTENT_FOR_TOOL[tool_keys[0]]]
+        # A question about more than one data source needs a custom analysis, also
+        # when only the tool selection (not the wording) spans several sources
+        if not matches or len({intent.tool for intent in matches}) > 1 or set(tool_keys) != {matches[0].tool}:
+            self.fallbacks += 1
+            return None
+        if predicting:
+            forecast = FORECASTS.get(matches[0].name)
+            if forecast is None:
+                self.fallbacks += 1
+            return forecast
+        return matches[0]
+
+    def bucket_for(self, intent: Optional[Union[Intent, ForecastIntent]], start_time, end_time) -> Optional[TimeBucket]:
+        """Bucket size the tools should fetch for `intent`; None keeps the size that suits a chart."""
+        if isinstance(intent, ForecastIntent):
+            return forecast_bucket(start_time, end_time)
+        return None
+
+    def run(self, intent: Union[Intent, ForecastIntent], tool_data: Dict[str, pd.DataFrame], start_time, end_time,
+            api_name: str = "", user_query: str = "") -> dict:
+        frame = tool_data.get(intent.tool)
+        if frame is None or frame.empty:
+            return result([f"No data found for {intent.tool}"], None, None, {})
+
+        bucket, window_start, window_end = bucket_window(start_time, end_time, self.bucket_for(intent, start_time, end_time))
+        index = pd.DatetimeIndex(bucket_starts(bucket, window_start, window_end), name=TIME_COLUMN)
+        frame = align_to_buckets(frame, index)
+        if isinstance(intent, ForecastIntent):
+            horizon = parse_horizon(user_query, bucket)
+            observed_until = min(to_utc(end_time), datetime.now(timezone.utc))
+            analysis = analyze_forecast(intent, frame, index, bucket, api_name, horizon, observed_until)
+        else:
+            analysis = intent.analyze(frame, index, bucket.label)
+        self.routed[intent.name] = self.routed.get(intent.name, 0) + 1
+        logging.info(f"Answered with the built-in {intent.name} analysis")
+        return analysis
+
+    def warm(self):
+        # Font loading and the first render are slow; pay for them before the first request
+        if self.enabled:
+            index = pd.DatetimeIndex([pd.Timestamp("2024-01-01", tz="UTC")], name=TIME_COLUMN)
+            bar_chart(pd.DataFrame({"hits": [0]}, index=index), "1d", "", "")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "routed": dict(self.routed),
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+        }
+
+
+@lru_cache()
+def get_insight_engine() -> InsightEngine:
+    return InsightEngine(enabled=get_settings().INSIGHT_ENGINE_ENABLED)
@@ -1,19 +1,242 @@
-from azure.kusto.data import KustoConnectionStringBuilder, KustoClient
-from azure.kusto.data.helpers import dataframe_from_result_table
-import os
+from azure.core.credentials import AccessToken
+from azure.identity.aio import ClientSecretCredential
+from azure.kusto.data import ClientRequestProperties, KustoConnectionStringBuilder
+from azure.kusto.data.aio import KustoClient
+from functools import lru_cache, partial
+from typing import AsyncIterator, List, Optional, Set
+import asyncio
+import logging
+import time
 
 from app.config import get_settings
-from functools import lru_cache
+from app.core.metrics import timed
+from app.core.query_scheduler import get_query_scheduler
+
+WARMUP_QUERY = "print 1"
+
+
+class KustoTokenCache:
+    """
+    AAD token for the cluster, kept fresh by a background task so queries
+    never wait on token acquisition. A token that is missing or about to
+    expire is fetched inline as a fallback.
+    """
+
+    def __init__(self, credential: ClientSecretCredential, scope: str, refresh_margin: float):
+        self.credential = credential
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self._token: Optional[AccessToken] = None
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.failures = 0
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and self._token.expires_on - time.time() > self.refresh_margin
+
+    async def get_token(self) -> str:
+        if not self._is_fresh():
+            await self.refresh()
+        return self._token.token
+
+    async def refresh(self):
+        async with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._is_fresh():
+                return
+            try:
+                self._token = await self.credential.get_token(self.scope)
+            except Exception:
+                self.failures += 1
+                raise
+            self.refreshes += 1
+
+    async def refresh_forever(self, retry_seconds: float):
+        while True:
+            if self._token is None:
+                delay = 0
+            else:
+                delay = max(self._token.expires_on - time.time() - self.refresh_margin, 0)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.warning(f"Kusto token refresh failed, retrying in {retry_seconds} seconds: {e}")
+                await asyncio.sleep(retry_seconds)
+
+    def expires_in(self) -> Optional[float]:
+        return self._token.expires_on - time.time() if self._token else None
+
+
+class KustoClientManager:
+    """
+    Owns the async Kusto client.
+
+    The client keeps a pool of HTTP connections to the cluster and takes its
+    bearer token from a KustoTokenCache. `start` is called from the app
+    lifespan: it creates the client and, in the background, fetches the
+    first token and runs a cheap warm-up query so TLS and token setup are
+    paid before the first request. A slow or unreachable cluster therefore
+    does not hold up startup. Until the warm-up succeeds `ready` stays
+    False; attempts that fail or run past `warmup_timeout` are retried.
+    """
+
+    def __init__(self, cluster_url: str, database: str, tenant_id: str, client_id: str, client_secret: str,
+                 token_refresh_margin: float, retry_seconds: float, warmup_timeout: float):
+        self.cluster_url = cluster_url
+        self.database = database
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_refresh_margin = token_refresh_margin
+        self.retry_seconds = retry_seconds
+        self.warmup_timeout = warmup_timeout
+        self._client: Optional[KustoClient] = None
+        self._credential: Optional[ClientSecretCredential] = None
+        self._tokens: Optional[KustoTokenCache] = None
+        self._background: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+
+    async def get_client(self) -> KustoClient:
+        # Outside the app lifespan (scripts, tests) the client is created on first use
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    self._create_client()
+        return self._client
+
+    def _create_client(self):
+        self._credential = ClientSecretCredential(self.tenant_id, self.client_id, self.client_secret)
+        self._tokens = KustoTokenCache(self._credential, f"{self.cluster_url.rstrip('/')}/.default", self.token_refresh_margin)
+        kcsb = KustoConnectionStringBuilder.with_async_token_provider(self.cluster_url, self._tokens.get_token)
+        self._client = KustoClient(kcsb)
+        self._track(asyncio.ensure_future(self._tokens.refresh_forever(self.retry_seconds)))
+
+    async def start(self):
+        await self.get_client()
+        self._track(asyncio.ensure_future(self._warm_up_until_ready()))
+
+    async def warm_up(self):
+        started = time.monotonic()
+        client = await self.get_client()
+        await self._tokens.get_token()
+        await client.execute_query(self.database, WARMUP_QUERY)
+        self.warmup_seconds = time.monotonic() - started
+        self.ready = True
+        logging.info(f"Kusto client warm in {self.warmup_seconds:.2f} seconds")
+
+    async def _warm_up_until_ready(self):
+        while not self.ready:
+            try:
+                await asyncio.wait_for(self.warm_up(), timeout=self.warmup_timeout)
+            except Exception as e:
+                logging.warning(f"Kusto warm-up failed, retrying in {self.retry_seconds} seconds: {e!r}")
+                await asyncio.sleep(self.retry_seconds)
+
+    async def stop(self):
+        for task in list(self._background):
+            task.cancel()
+        if self._client is not None:
+            await self._client.close()
+        if self._credential is not None:
+            await self._credential.close()
+        self._client = None
+        self._credential = None
+        self.ready = False
+
+    def _track(self, task: asyncio.Task):
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": self.warmup_seconds,
+            "token_expires_in": self._tokens.expires_in() if self._tokens else None,
+            "token_refreshes": self._tokens.refreshes if self._tokens else 0,
+            "token_failures": self._tokens.failures if self._tokens else 0,
+        }
 
 
 @lru_cache()
-def get_kusto_client() -> KustoClient:
+def get_kusto_manager() -> KustoClientManager:
+    settings = get_settings()
+    return KustoClientManager(
+        cluster_url=settings.KUSTO_CLUSTER_URL,
+        database=settings.KUSTO_DATABASE_NAME,
+        tenant_id=settings.KUSTO_TENANT_ID,
+        client_id=settings.KUSTO_CLIENT_ID,
+        client_secret=settings.KUSTO_CLIENT_SECRET,
+        token_refresh_margin=settings.KUSTO_TOKEN_REFRESH_MARGIN_SECONDS,
+        retry_seconds=settings.KUSTO_WARMUP_RETRY_SECONDS,
+        warmup_timeout=settings.KUSTO_WARMUP_TIMEOUT_SECONDS
+    )
+
+
+def kusto_query_key(database: str) -> str:
+    # Admission control is per cluster and database
+    return f"{get_settings().KUSTO_CLUSTER_URL}/{database}"
+
+
+async def cancel_kusto_query(database: str, request_id: str):
+    client = await get_kusto_manager().get_client()
+    await client.execute_mgmt(database, f'.cancel query "{request_id}"')
+
+
+async def execute_kusto_query(query: str, database: str = None, properties: ClientRequestProperties = None):
+    # The scheduler limits how many queries run at once and cancels the
+    # server-side query if we are cancelled.
     settings = get_settings()
+    client = await get_kusto_manager().get_client()
+    database = database or settings.KUSTO_DATABASE_NAME
+    async with get_query_scheduler().admit(
+        kusto_query_key(database), partial(cancel_kusto_query, database), properties
+    ) as lease:
+        with timed("kusto_query"):
+            return await client.execute(database, query, lease.properties)
+
+
+async def open_kusto_stream(query: str, database: str = None, properties: ClientRequestProperties = None):
+    """
+    Start a query with the streaming client and return its primary result
+    table, before any rows are read, together with its scheduler lease.
+    Read rows with iter_kusto_batches and release the lease when done; mark
+    it completed first if every row was read, otherwise the server-side
+    query is cancelled.
+    """
+    settings = get_settings()
+    client = await get_kusto_manager().get_client()
+    database = database or settings.KUSTO_DATABASE_NAME
+    lease = await get_query_scheduler().acquire(
+        kusto_query_key(database), partial(cancel_kusto_query, database), properties
+    )
+
+    try:
+        response = await client.execute_streaming_query(database, query, properties=lease.properties)
+        try:
+            table = await response.iter_primary_results().__anext__()
+        except StopAsyncIteration:
+            raise Exception("Query returned no primary result")
+    except asyncio.CancelledError:
+        lease.release()
+        raise
+    except Exception:
+        lease.completed = True
+        lease.release()
+        raise
+    return table, lease
 
-    # Use InteractiveBrowserCredential for user login
-    credential = KustoConnectionStringBuilder.with_aad_application_key_authentication(
-            settings.KUSTO_CLUSTER_URL, settings.KUSTO_CLIENT_ID,settings.KUSTO_CLIENT_SECRET,settings.KUSTO_TENANT_ID
-        )
 
-    
-    return KustoClient(credential)
+async def iter_kusto_batches(table, batch_size: int) -> AsyncIterator[List[list]]:
+    # Rows are decoded as they arrive and handed out a batch at a time, so
+    # only one batch is held in memory
+    rows = []
+    async for row in table:
+        rows.append(list(row))
+        if len(rows) >= batch_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
@@ -0,0 +1,61 @@
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+from functools import lru_cache
+
+from app.config import get_settings
+from app.core.metrics import record_llm_usage
+from app.core.single_flight import get_single_flight, request_key
+
+
+@lru_cache()
+def get_openai_client() -> AsyncOpenAI:
+    settings = get_settings()
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+
+
+@lru_cache()
+def get_anthropic_client() -> AsyncAnthropic:
+    settings = get_settings()
+    return AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL)
+
+
+def deterministic(request: dict) -> bool:
+    # Only temperature 0 calls give every caller the answer it would have got on its own
+    temperature = get_settings().LLM_PLANNING_TEMPERATURE
+    if temperature is not None:
+        request.setdefault("temperature", temperature)
+    return request.get("temperature") == 0
+
+
+async def coalesced_openai_completion(stage: str, **request):
+    """
+    Chat completion for planning calls. Sent with LLM_PLANNING_TEMPERATURE
+    when set; at temperature 0 concurrent callers sending the identical
+    request share one API call, otherwise every call goes out on its own.
+    """
+    async def create():
+        response = await get_openai_client().chat.completions.create(**request)
+        record_llm_usage("openai", stage, response.usage)
+        return response
+
+    if not deterministic(request):
+        return await create()
+    return await get_single_flight("llm").do(request_key("openai", request), create)
+
+
+async def coalesced_anthropic_message(stage: str, **request):
+    """Anthropic counterpart of coalesced_openai_completion."""
+    async def create():
+        response = await get_anthropic_client().messages.create(**request)
+        record_llm_usage("anthropic", stage, response.usage)
+        return response
+
+    if not deterministic(request):
+        return await create()
+    return await get_single_flight("llm").do(request_key("anthropic", request), create)
+
+
+def llm_coalescing_stats() -> dict:
+    # With the provider default temperature nothing is coalesced; say so rather than show zeros
+    temperature = get_settings().LLM_PLANNING_TEMPERATURE
+    return {"enabled": temperature == 0, "temperature": temperature, **get_single_flight("llm").stats()}
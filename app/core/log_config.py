@@ -0,0 +1,171 @@
+from app.config import get_settings
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(request_id)s - %(message)s"
+
+# Request ID and whether this request logs full payloads, set by RequestLoggingMiddleware
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+_verbose: ContextVar[bool] = ContextVar("verbose_logging", default=False)
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to a background thread through a bounded queue. When the
+    queue is full the record is dropped and counted rather than blocking the
+    event loop on a slow stream.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve the message here; timestamps and layout are formatted on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging():
+    """
+    Route all logging through a bounded queue drained by a background thread.
+    Safe to call more than once; only the first call installs the handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    settings = get_settings()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
+
+
+def logging_stats() -> dict:
+    handlers = [handler for handler in logging.getLogger().handlers if isinstance(handler, BoundedQueueHandler)]
+    return {
+        "queued": sum(handler.queue.qsize() for handler in handlers),
+        "dropped": sum(handler.dropped for handler in handlers),
+    }
+
+
+def verbose_logging() -> bool:
+    return _verbose.get()
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def summarize_payload(payload, max_chars: Optional[int] = None) -> str:
+    """
+    Short description of a payload for the log: sizes and a hash instead of
+    the body. Text up to `max_chars` is kept as it is.
+    """
+    max_chars = get_settings().LOG_PAYLOAD_MAX_CHARS if max_chars is None else max_chars
+    if hasattr(payload, "memory_usage") and hasattr(payload, "columns"):
+        size = int(payload.memory_usage(deep=True).sum())
+        return f"<DataFrame rows={len(payload)} columns={list(payload.columns)} bytes={size}>"
+    if isinstance(payload, (list, tuple)) and not payload:
+        return "[]"
+    if not isinstance(payload, str):
+        text = json.dumps(payload, default=str)
+        if len(text) <= max_chars:
+            return text
+        kind = type(payload).__name__
+        if isinstance(payload, dict):
+            return f"<{kind} keys={list(payload)[:20]} chars={len(text)} sha256={_digest(text.encode('utf-8'))}>"
+        if isinstance(payload, (list, tuple)):
+            return f"<{kind} items={len(payload)} chars={len(text)} sha256={_digest(text.encode('utf-8'))}>"
+        return f"<{kind} chars={len(text)} sha256={_digest(text.encode('utf-8'))}>"
+    if len(payload) <= max_chars:
+        return payload
+    return f"{payload[:max_chars]}... <{len(payload)} chars sha256={_digest(payload.encode('utf-8'))}>"
+
+
+def log_payload(label: str, payload, level: int = logging.INFO):
+    """Log a payload in full for verbose requests, otherwise only its summary."""
+    if not logging.getLogger().isEnabledFor(level):
+        return
+    if verbose_logging():
+        text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+        logging.log(level, f"{label} (full): {text}")
+    else:
+        logging.log(level, f"{label}: {summarize_payload(payload)}")
+
+
+class RequestLoggingMiddleware:
+    """
+    Gives each request an ID for its log lines (echoed in X-Request-ID) and
+    decides whether it logs full payloads: a sampled share of requests does,
+    and in DEBUG_MODE any request sending `X-Debug-Log: 1`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        verbose = (settings.DEBUG_MODE and headers.get(b"x-debug-log") in (b"1", b"true")) or (
+            settings.LOG_VERBOSE_SAMPLE_RATE > 0 and random.random() < settings.LOG_VERBOSE_SAMPLE_RATE
+        )
+        id_token = _request_id.set(request_id)
+        verbose_token = _verbose.set(verbose)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(id_token)
+            _verbose.reset(verbose_token)
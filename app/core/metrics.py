@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from typing import Awaitable, List, Optional, Tuple, TypeVar
+import re
+import time
+
+T = TypeVar("T")
+
+# From fast cache hits up to long analyzer runs
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "insights_stage_seconds", "Time spent in each request stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+TOOL_SECONDS = Histogram(
+    "insights_tool_seconds", "Time spent fetching data per tool", ["tool"], buckets=LATENCY_BUCKETS
+)
+ROWS_FETCHED = Counter("insights_rows_fetched", "Rows returned by data tools", ["tool"])
+BYTES_MOVED = Counter("insights_bytes", "Bytes moved between stages", ["kind"])
+LLM_TOKENS = Counter("insights_llm_tokens", "LLM tokens used", ["provider", "stage", "direction"])
+COALESCED_CALLS = Counter("insights_coalesced_calls", "Calls that joined an identical in-flight call", ["group"])
+
+# Timings of the current request, read by ServerTimingMiddleware
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str, histogram: Histogram = STAGE_SECONDS, label: str = "stage"):
+    """Time a block into `histogram` and the Server-Timing of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.labels(**{label: stage}).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+async def timed_await(stage: str, awaitable: Awaitable[T]) -> T:
+    with timed(stage):
+        return await awaitable
+
+
+def record_llm_usage(provider: str, stage: str, usage):
+    # OpenAI reports prompt/completion tokens, Anthropic input/output tokens
+    if usage is None:
+        return
+    tokens_in = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    tokens_out = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+    LLM_TOKENS.labels(provider=provider, stage=stage, direction="in").inc(tokens_in)
+    LLM_TOKENS.labels(provider=provider, stage=stage, direction="out").inc(tokens_out)
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    # Metric names must be HTTP tokens
+    return ", ".join(
+        f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)};dur={elapsed * 1000:.1f}" for name, elapsed in timings
+    )
+
+
+class ServerTimingMiddleware:
+    """
+    Collects the stage timings of each request and sends them in a
+    Server-Timing header. Plain ASGI so streaming responses and disconnect
+    detection are left alone; for streams only stages finished before the
+    first byte are included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                entries = timings + [("total", time.perf_counter() - started)]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+
+
+def request_timings() -> dict:
+    """Stage timings of the current request so far, in milliseconds."""
+    timings = _request_timings.get() or []
+    return {name: round(elapsed * 1000, 1) for name, elapsed in timings}
+
+
+class SchedulerCollector:
+    """Exports Kusto admission control and analyzer pool state at scrape time."""
+
+    def describe(self):
+        # Nothing to declare up front; keeps registration from calling collect
+        return []
+
+    def collect(self):
+        from app.core.analyzer_pool import get_analyzer_pool
+        from app.core.query_scheduler import get_query_scheduler
+
+        active = GaugeMetricFamily("insights_kusto_queries_active", "Kusto queries running", labels=["target"])
+        waiting = GaugeMetricFamily("insights_kusto_queries_waiting", "Kusto queries waiting for a slot", labels=["target"])
+        wait_seconds = CounterMetricFamily(
+            "insights_kusto_queue_wait_seconds", "Total time queries waited for a slot", labels=["target"]
+        )
+        outcomes = CounterMetricFamily(
+            "insights_kusto_queries", "Kusto queries by admission outcome", labels=["target", "outcome"]
+        )
+        for target, stats in get_query_scheduler().stats().items():
+            active.add_metric([target], stats["active"])
+            waiting.add_metric([target], stats["waiting"])
+            wait_seconds.add_metric([target], stats["wait_seconds_total"])
+            for outcome in ("admitted", "rejected", "timed_out", "cancelled"):
+                outcomes.add_metric([target, outcome], stats[outcome])
+        yield from (active, waiting, wait_seconds, outcomes)
+
+        pool = get_analyzer_pool().stats()
+        yield GaugeMetricFamily("insights_analyzer_idle_workers", "Idle analyzer workers", value=pool["idle"])
+        yield GaugeMetricFamily("insights_analyzer_waiting_jobs", "Jobs waiting for an analyzer worker", value=pool["waiting"])
+
+
+REGISTRY.register(SchedulerCollector())
@@ -0,0 +1,188 @@
+from app.config import get_settings
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import math
+
+# Rough characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Counts come from the OpenAI tokenizer. Claude's tokenizer is not public and
+# splits the same text (code, JSON, numbers) into more tokens, so counts for
+# Anthropic prompts are scaled up to stay on the safe side of the budget.
+PROVIDER_TOKEN_MARGINS = {"openai": 1.0, "anthropic": 1.25}
+
+# Reductions tried in order until the prompt fits: significant digits kept
+# for floats and the number of items kept from long lists and dicts
+COMPACTION_STEPS = [
+    {"digits": 6, "max_items": None},
+    {"digits": 4, "max_items": 40},
+    {"digits": 3, "max_items": 12},
+    {"digits": 2, "max_items": 4},
+]
+
+
+def round_float(value: float, digits: int) -> float:
+    if math.isnan(value) or math.isinf(value):
+        return value
+    return float(f"{value:.{digits}g}")
+
+
+def truncation_summary(items: List[Any], max_items: int, digits: int) -> dict:
+    # Statistics cover every item, including the ones that are kept
+    numbers = [item for item in items if isinstance(item, (int, float)) and not isinstance(item, bool)]
+    summary = {"omitted": len(items) - max_items, "count": len(items)}
+    if numbers:
+        summary.update({
+            "min": min(numbers),
+            "max": max(numbers),
+            "mean": sum(numbers) / len(numbers),
+        })
+    return {key: round_float(item, digits) if isinstance(item, float) else item for key, item in summary.items()}
+
+
+def compact_value(value: Any, digits: int, max_items: Optional[int]) -> Any:
+    """
+    Return a reduced copy of a JSON-like value. Floats are rounded to `digits`
+    significant digits; lists and dicts longer than `max_items` keep their head
+    and tail plus a summary (count, min, max, mean) of everything they held.
+    """
+    if isinstance(value, float):
+        return round_float(value, digits)
+
+    if isinstance(value, list):
+        if max_items is None or len(value) <= max_items:
+            return [compact_value(item, digits, max_items) for item in value]
+        head, tail = max_items // 2, max_items - max_items // 2
+        summary = truncation_summary(value, max_items, digits)
+        return (
+            [compact_value(item, digits, max_items) for item in value[:head]]
+            + [{"_truncated": summary}]
+            + [compact_value(item, digits, max_items) for item in value[len(value) - tail:]]
+        )
+
+    if isinstance(value, dict):
+        items = list(value.items())
+        if max_items is None or len(items) <= max_items:
+            return {key: compact_value(item, digits, max_items) for key, item in items}
+        head, tail = max_items // 2, max_items - max_items // 2
+        kept = items[:head] + items[len(items) - tail:]
+        compacted = {key: compact_value(item, digits, max_items) for key, item in kept}
+        compacted["_truncated"] = truncation_summary([item for _, item in items], max_items, digits)
+        return compacted
+
+    return value
+
+
+def dedupe_insights(result: Any) -> Any:
+    if not isinstance(result, dict) or not isinstance(result.get("insights"), list):
+        return result
+    seen = set()
+    insights = []
+    for insight in result["insights"]:
+        marker = str(insight).strip().lower()
+        if marker not in seen:
+            seen.add(marker)
+            insights.append(insight)
+    return {**result, "insights": insights}
+
+
+class PromptGovernor:
+    """
+    Keeps LLM prompts within a per-stage token budget.
+
+    The caller passes the variable part of a prompt (e.g. the analyzer result)
+    and a function that builds the messages from it. If the built prompt is
+    over budget the payload is reduced step by step: duplicated insights are
+    dropped, floats are rounded and long lists are cut to head and tail plus
+    statistics. Every call records the token counts before and after. Prompts
+    sent to Anthropic models are counted with a safety margin.
+    """
+
+    def __init__(self, model: str, budgets: Dict[str, int]):
+        self.model = model
+        self.budgets = budgets
+        self._encoding = None
+        self._tokenizer_loaded = False
+        self._stats: Dict[str, dict] = {}
+
+    def _get_encoding(self):
+        if not self._tokenizer_loaded:
+            self._tokenizer_loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logging.warning(f"Tokenizer unavailable, estimating prompt tokens from length: {e}")
+        return self._encoding
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_message_tokens(self, messages: List[dict], provider: str = "openai") -> int:
+        tokens = sum(self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+        return math.ceil(tokens * PROVIDER_TOKEN_MARGINS[provider])
+
+    def fit(self, stage: str, payload: Any, build_messages: Callable[[Any], List[dict]],
+            provider: str = "openai") -> List[dict]:
+        """Messages built from `payload`, reduced until they fit the stage's budget for `provider`."""
+        budget = self.budgets[stage]
+        messages = build_messages(payload)
+        original_tokens = tokens = self.count_message_tokens(messages, provider)
+
+        step = 0
+        if tokens > budget:
+            payload = dedupe_insights(payload)
+            for step, reduction in enumerate(COMPACTION_STEPS, start=1):
+                messages = build_messages(compact_value(payload, **reduction))
+                tokens = self.count_message_tokens(messages, provider)
+                if tokens <= budget:
+                    break
+
+        self._record(stage, original_tokens, tokens, step, tokens > budget)
+        if tokens > budget:
+            logging.warning(f"{stage} prompt is {tokens} tokens after compaction, over the {budget} token budget")
+        else:
+            logging.info(f"{stage} prompt: {tokens} tokens (was {original_tokens}, compaction step {step})")
+        return messages
+
+    def _record(self, stage: str, original_tokens: int, tokens: int, step: int, over_budget: bool):
+        stats = self._stats.setdefault(stage, {
+            "requests": 0,
+            "compacted": 0,
+            "over_budget": 0,
+            "original_tokens": 0,
+            "prompt_tokens": 0,
+        })
+        stats["requests"] += 1
+        stats["compacted"] += 1 if step else 0
+        stats["over_budget"] += 1 if over_budget else 0
+        stats["original_tokens"] += original_tokens
+        stats["prompt_tokens"] += tokens
+        stats["last"] = {"original_tokens": original_tokens, "prompt_tokens": tokens, "compaction_step": step}
+
+    def stats(self) -> dict:
+        return {
+            stage: {
+                "budget": self.budgets[stage],
+                **stats,
+                "saved_tokens": stats["original_tokens"] - stats["prompt_tokens"],
+            }
+            for stage, stats in self._stats.items()
+        }
+
+
+@lru_cache()
+def get_prompt_governor() -> PromptGovernor:
+    settings = get_settings()
+    return PromptGovernor(settings.OPEN_AI_MODEL, {
+        "codegen": settings.CODEGEN_PROMPT_MAX_TOKENS,
+        "summary": settings.SUMMARY_PROMPT_MAX_TOKENS,
+    })
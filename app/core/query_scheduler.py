@@ -0,0 +1,170 @@
+from app.config import get_settings
+from azure.kusto.data import ClientRequestProperties
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import logging
+import time
+import uuid
+
+CLIENT_REQUEST_ID_PREFIX = "insights_analyzer"
+
+
+class QueryRejected(Exception):
+    """A query was turned away because too many are running or queued; the routes answer 503."""
+
+
+class QueryLease:
+    """
+    One admitted query. Carries the client request ID sent with the query so
+    the server-side query can be cancelled if the lease is released before
+    the query finished.
+    """
+
+    def __init__(self, scheduler: "QueryScheduler", key: str, cancel: Callable[[str], Awaitable[None]],
+                 properties: Optional[ClientRequestProperties] = None):
+        self.scheduler = scheduler
+        self.key = key
+        self.cancel = cancel
+        self.request_id = f"{CLIENT_REQUEST_ID_PREFIX};{uuid.uuid4()}"
+        self.properties = properties or ClientRequestProperties()
+        self.properties.client_request_id = self.request_id
+        self.completed = False
+        self._released = False
+
+    def release(self):
+        # Safe to call more than once; only the first call counts
+        if self._released:
+            return
+        self._released = True
+        self.scheduler._release(self)
+
+
+class QueryScheduler:
+    """
+    Admission control for Kusto queries.
+
+    Each cluster/database gets a fixed number of concurrent query slots.
+    Callers beyond that wait in a bounded queue for up to `queue_timeout`
+    seconds and are turned away with QueryRejected when the queue is full or
+    the wait runs out. A query whose lease is released before it completed (the caller
+    was cancelled, e.g. because the client went away) is cancelled on the
+    server by its client request ID.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, dict] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def _stats_for(self, key: str) -> dict:
+        return self._stats.setdefault(key, {
+            "active": 0,
+            "waiting": 0,
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        })
+
+    async def acquire(self, key: str, cancel: Callable[[str], Awaitable[None]],
+                      properties: Optional[ClientRequestProperties] = None) -> QueryLease:
+        slots = self._slots.setdefault(key, asyncio.Semaphore(self.max_concurrent))
+        stats = self._stats_for(key)
+        started = time.monotonic()
+        if not slots.locked():
+            # A free slot is taken without yielding to the event loop
+            await slots.acquire()
+        else:
+            if stats["waiting"] >= self.max_queue:
+                stats["rejected"] += 1
+                raise QueryRejected("Too many Kusto queries queued, please retry shortly")
+
+            stats["waiting"] += 1
+            acquire = asyncio.ensure_future(slots.acquire())
+            try:
+                await asyncio.wait({acquire}, timeout=self.queue_timeout)
+            except asyncio.CancelledError:
+                self._abandon(acquire, slots)
+                raise
+            finally:
+                stats["waiting"] -= 1
+            if not acquire.done():
+                self._abandon(acquire, slots)
+                stats["timed_out"] += 1
+                raise QueryRejected(f"No Kusto query slot within {self.queue_timeout} seconds, please retry shortly")
+
+        waited = time.monotonic() - started
+        stats["active"] += 1
+        stats["admitted"] += 1
+        stats["wait_seconds_total"] += waited
+        stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+        return QueryLease(self, key, cancel, properties)
+
+    @asynccontextmanager
+    async def admit(self, key: str, cancel: Callable[[str], Awaitable[None]],
+                    properties: Optional[ClientRequestProperties] = None):
+        lease = await self.acquire(key, cancel, properties)
+        try:
+            yield lease
+            lease.completed = True
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The query failed on its own, there is nothing left to cancel
+            lease.completed = True
+            raise
+        finally:
+            lease.release()
+
+    @staticmethod
+    def _abandon(acquire: asyncio.Task, slots: asyncio.Semaphore):
+        # The slot may be granted just as we give up; hand it back instead of losing it
+        acquire.cancel()
+        acquire.add_done_callback(lambda done: None if done.cancelled() else slots.release())
+
+    def _release(self, lease: QueryLease):
+        stats = self._stats_for(lease.key)
+        stats["active"] -= 1
+        self._slots[lease.key].release()
+        if not lease.completed:
+            stats["cancelled"] += 1
+            self._track(asyncio.ensure_future(self._cancel(lease)))
+
+    async def _cancel(self, lease: QueryLease):
+        logging.info(f"Cancelling abandoned Kusto query {lease.request_id}")
+        try:
+            await lease.cancel(lease.request_id)
+        except Exception as e:
+            logging.warning(f"Could not cancel Kusto query {lease.request_id}: {e}")
+
+    def _track(self, task: asyncio.Task):
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> dict:
+        return {
+            key: {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                **stats,
+                "wait_seconds_avg": stats["wait_seconds_total"] / stats["admitted"] if stats["admitted"] else 0.0,
+            }
+            for key, stats in self._stats.items()
+        }
+
+
+@lru_cache()
+def get_query_scheduler() -> QueryScheduler:
+    settings = get_settings()
+    return QueryScheduler(
+        max_concurrent=settings.KUSTO_MAX_CONCURRENT_QUERIES,
+        max_queue=settings.KUSTO_QUERY_QUEUE_DEPTH,
+        queue_timeout=settings.KUSTO_QUERY_QUEUE_TIMEOUT_SECONDS
+    )
@@ -0,0 +1,171 @@
+from app.config import get_settings
+from app.core.dataset import TIME_COLUMN, concat_frames, frame_size
+from app.utils.query_helper import TimeBucket
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import logging
+import pandas as pd
+
+Interval = Tuple[datetime, datetime]
+
+
+def subtract_intervals(window: Interval, covered: List[Interval]) -> List[Interval]:
+    """Return the parts of window not contained in the sorted, merged covered list."""
+    start, end = window
+    missing = []
+    for covered_start, covered_end in covered:
+        if covered_end <= start:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > start:
+            missing.append((start, covered_start))
+        start = max(start, covered_end)
+    if start < end:
+        missing.append((start, end))
+    return missing
+
+
+def merge_interval(covered: List[Interval], interval: Interval) -> List[Interval]:
+    merged = []
+    for current in sorted(covered + [interval]):
+        if merged and current[0] <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], current[1]))
+        else:
+            merged.append(current)
+    return merged
+
+
+def in_intervals(frame: pd.DataFrame, intervals: List[Interval]) -> pd.Series:
+    times = frame[TIME_COLUMN]
+    mask = pd.Series(False, index=frame.index)
+    for start, end in intervals:
+        mask |= (times >= start) & (times < end)
+    return mask
+
+
+class _CacheEntry:
+    def __init__(self):
+        self.covered: List[Interval] = []
+        self.frame: Optional[pd.DataFrame] = None
+        self.size = 0
+
+
+class ToolResultCache:
+    """
+    Two-tier cache for bucketed tool results.
+
+    Buckets that closed before the settle cutoff never change, so they are kept
+    until evicted by the byte budget. Buckets after the cutoff form the open tail
+    and are always re-fetched. Requests that overlap cached history only query
+    Kusto for the missing gaps and the open tail.
+    """
+
+    def __init__(self, max_bytes: int, settle_seconds: int):
+        self.max_bytes = max_bytes
+        self.settle = timedelta(seconds=settle_seconds)
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self.bytes_fetched = 0
+
+    async def fetch(
+        self,
+        key: tuple,
+        bucket: TimeBucket,
+        window_start: datetime,
+        window_end: datetime,
+        fetcher: Callable[[datetime, datetime], Awaitable[pd.DataFrame]],
+    ) -> pd.DataFrame:
+        # Entries are only created once they hold sealed buckets; a key that
+        # only ever sees the open tail (or failed fetches) leaves nothing behind
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        else:
+            entry = _CacheEntry()
+
+        missing = subtract_intervals((window_start, window_end), entry.covered)
+        cached = None
+        if entry.frame is not None:
+            cached = entry.frame[in_intervals(entry.frame, [(window_start, window_end)])]
+
+        if not missing:
+            self.hits += 1
+            logging.info(f"Tool cache hit for {key}")
+            return concat_frames([cached])
+
+        if len(missing) == 1 and missing[0] == (window_start, window_end):
+            self.misses += 1
+        else:
+            self.partial_hits += 1
+        logging.info(f"Tool cache fetching {len(missing)} interval(s) for {key}: {missing}")
+
+        fetched = await asyncio.gather(*(fetcher(start, end) for start, end in missing))
+
+        sealed_until = bucket.floor(datetime.now(timezone.utc) - self.settle)
+        for (start, end), frame in zip(missing, fetched):
+            self.bytes_fetched += frame_size(frame)
+            if start < sealed_until:
+                self._store(key, frame, (start, min(end, sealed_until)))
+
+        self._evict(keep=key)
+        return concat_frames(([cached] if cached is not None else []) + list(fetched))
+
+    def _store(self, key: tuple, frame: pd.DataFrame, sealed: Interval):
+        # Another request may have sealed part of this interval (or evicted the
+        # entry) while we were fetching; only store what is still uncovered so
+        # merging stays idempotent.
+        entry = self._entries.get(key) or _CacheEntry()
+        gaps = subtract_intervals(sealed, entry.covered)
+        if not gaps:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        sealed_rows = frame[in_intervals(frame, gaps)]
+        if entry.frame is None:
+            entry.frame = concat_frames([sealed_rows])
+        else:
+            entry.frame = concat_frames([entry.frame, sealed_rows])
+
+        size = frame_size(entry.frame)
+        self.bytes += size - entry.size
+        entry.size = size
+        for gap in gaps:
+            entry.covered = merge_interval(entry.covered, gap)
+
+    def _evict(self, keep: tuple):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = next(iter(self._entries.items()))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
+            self.bytes -= entry.size
+            self.evictions += 1
+            logging.info(f"Evicted tool cache entry {key} ({entry.size} bytes)")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+
+@lru_cache()
+def get_tool_cache() -> ToolResultCache:
+    settings = get_settings()
+    return ToolResultCache(settings.TOOL_CACHE_MAX_BYTES, settings.TOOL_CACHE_SETTLE_SECONDS)
@@ -0,0 +1,297 @@
+from app.config import get_settings
+from app.core.dataset import TIME_COLUMN, normalize_frame
+from app.utils.query_helper import BUCKET_ANCHOR, DAILY, HOURLY, TimeBucket
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+# Sizes kept in the store, with how far back each is kept and how much one sync query covers
+STORED_BUCKETS = (HOURLY, DAILY)
+SYNC_CHUNKS = {"1h": timedelta(days=7), "1d": timedelta(days=31)}
+
+Window = Tuple[datetime, datetime]
+
+
+def to_epoch(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def from_epoch(value: int) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def bucket_expression(bucket: TimeBucket) -> str:
+    # SQL equivalent of TimeBucket.floor on epoch seconds
+    if bucket.span is None:
+        return f"CAST(strftime('%s', {quote(TIME_COLUMN)}, 'unixepoch', 'start of month') AS INTEGER)"
+    anchor, span = to_epoch(BUCKET_ANCHOR), int(bucket.span.total_seconds())
+    return f"({quote(TIME_COLUMN)} - {anchor}) / {span} * {span} + {anchor}"
+
+
+class RollupStore:
+    """
+    Local SQLite store of hourly and daily tool results for the configured
+    organization and deployment.
+
+    A background job appends buckets once they have settled (backfilling the
+    retention period on the first run), so long-range questions are answered
+    from disk and only the open tail goes to Kusto. Tools whose measures can
+    be summed are also served in larger buckets, summed from the daily rows;
+    the others (percentiles) only at the sizes stored.
+    """
+
+    def __init__(self, path: str, organization_id: str, environment_id: str, retention_days: Dict[str, int],
+                 settle_seconds: int, sync_interval_seconds: int, enabled: bool = True):
+        self.path = path
+        self.scope = f"{organization_id}/{environment_id}"
+        self.retention = {label: timedelta(days=days) for label, days in retention_days.items()}
+        self.settle = timedelta(seconds=settle_seconds)
+        self.sync_interval = sync_interval_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # (tool key, bucket label) -> window of stored buckets
+        self._coverage: Dict[Tuple[str, str], Window] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.reads = 0
+        self.rows_served = 0
+        self.rows_synced = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.last_sync: Optional[datetime] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS rollup_meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rollup_sync "
+            "(tool TEXT, bucket TEXT, synced_from INTEGER, synced_until INTEGER, PRIMARY KEY (tool, bucket))"
+        )
+        row = connection.execute("SELECT value FROM rollup_meta WHERE key = 'scope'").fetchone()
+        if row is not None and row[0] != self.scope:
+            # Rollups of another organization or deployment are of no use here
+            logging.info(f"Rollup store was built for {row[0]}, rebuilding for {self.scope}")
+            tables = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT IN ('rollup_meta', 'rollup_sync')"
+            ).fetchall()
+            for (table,) in tables:
+                connection.execute(f"DROP TABLE {quote(table)}")
+            connection.execute("DELETE FROM rollup_sync")
+        connection.execute("INSERT OR REPLACE INTO rollup_meta VALUES ('scope', ?)", (self.scope,))
+        connection.commit()
+
+        for tool_key, label, synced_from, synced_until in connection.execute("SELECT * FROM rollup_sync"):
+            self._coverage[(tool_key, label)] = (from_epoch(synced_from), from_epoch(synced_until))
+        self._connection = connection
+        return connection
+
+    def _table(self, tool_key: str, bucket: TimeBucket) -> str:
+        return quote(f"{tool_key}_{bucket.label}")
+
+    def _ensure_table(self, connection: sqlite3.Connection, tool, bucket: TimeBucket):
+        columns = [column for column in tool.columns if column != "bucketSize"]
+        table = self._table(tool.key, bucket)
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(quote(column) for column in columns)})")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {quote(f'{tool.key}_{bucket.label}_time')} "
+                           f"ON {table} ({quote(TIME_COLUMN)})")
+
+    def source_for(self, tool, bucket: TimeBucket) -> Optional[TimeBucket]:
+        """The stored size `bucket` can be built from, if any."""
+        if not self.enabled:
+            return None
+        for stored in STORED_BUCKETS:
+            if stored.label == bucket.label:
+                return stored
+        # Sums over days add up to any larger bucket; percentiles do not
+        if tool.rollup_sum and (bucket.span is None or bucket.span > DAILY.span):
+            return DAILY
+        return None
+
+    def servable(self, tool, bucket: TimeBucket, window_start: datetime, window_end: datetime) -> Optional[Window]:
+        """
+        The part of [window_start, window_end) the store can answer in `bucket`
+        sized buckets; the head before it and the tail after it have to come
+        from Kusto.
+        """
+        source = self.source_for(tool, bucket)
+        if source is None:
+            return None
+        with self._lock:
+            self._connect()
+            coverage = self._coverage.get((tool.key, source.label))
+        if coverage is None:
+            return None
+        # Only whole buckets; one straddling either end of the stored rows comes from Kusto
+        start = max(window_start, bucket.ceil(coverage[0]))
+        end = min(window_end, bucket.floor(coverage[1]))
+        if end <= start:
+            return None
+        return start, end
+
+    def read(self, tool, bucket: TimeBucket, api_name: Optional[str], start: datetime, end: datetime) -> pd.DataFrame:
+        """Rows of `tool` in `bucket` sized buckets for [start, end); `api_name` None means all APIs."""
+        source = self.source_for(tool, bucket)
+        table = self._table(tool.key, source)
+        stored_columns = [column for column in tool.columns if column != "bucketSize"]
+        api_filter = f" AND {quote('apiName')} = ?" if api_name is not None and "apiName" in stored_columns else ""
+        parameters = [to_epoch(start), to_epoch(end)] + ([api_name] if api_filter else [])
+
+        if source.label == bucket.label:
+            select = f"SELECT {', '.join(quote(column) for column in stored_columns)} FROM {table}"
+            group_by = ""
+        else:
+            dimensions = [column for column in stored_columns if column != TIME_COLUMN and column not in tool.rollup_sum]
+            select = (f"SELECT {bucket_expression(bucket)} AS {quote(TIME_COLUMN)}, "
+                      + ", ".join([quote(column) for column in dimensions]
+                                  + [f"SUM({quote(column)}) AS {quote(column)}" for column in tool.rollup_sum])
+                      + f" FROM {table}")
+            group_by = " GROUP BY " + ", ".join(["1"] + [quote(column) for column in dimensions])
+        sql = f"{select} WHERE {quote(TIME_COLUMN)} >= ? AND {quote(TIME_COLUMN)} < ?{api_filter}{group_by}"
+
+        with self._lock:
+            connection = self._connect()
+            frame = pd.read_sql_query(sql, connection, params=parameters)
+
+        frame[TIME_COLUMN] = pd.to_datetime(frame[TIME_COLUMN], unit="s", utc=True)
+        frame["bucketSize"] = bucket.label
+        self.reads += 1
+        self.rows_served += len(frame)
+        return normalize_frame(frame[list(tool.columns)])
+
+    def append(self, tool, bucket: TimeBucket, frame: pd.DataFrame, start: datetime, end: datetime):
+        """Store the rows of [start, end) and extend the synced window, in one transaction."""
+        stored_columns = [column for column in tool.columns if column != "bucketSize"]
+        rows = frame[stored_columns].copy()
+        rows[TIME_COLUMN] = rows[TIME_COLUMN].map(lambda timestamp: int(timestamp.timestamp()))
+        for column in rows.columns:
+            if isinstance(rows[column].dtype, pd.CategoricalDtype):
+                rows[column] = rows[column].astype(object)
+        values = rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+
+        table = self._table(tool.key, bucket)
+        with self._lock:
+            connection = self._connect()
+            self._ensure_table(connection, tool, bucket)
+            synced_from = self._coverage.get((tool.key, bucket.label), (start, end))[0]
+            with connection:
+                # Clear the window first so a repeated sync cannot duplicate rows
+                connection.execute(f"DELETE FROM {table} WHERE {quote(TIME_COLUMN)} >= ? AND {quote(TIME_COLUMN)} < ?",
+                                   (to_epoch(start), to_epoch(end)))
+                connection.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join('?' for _ in stored_columns)})", values
+                )
+                connection.execute("INSERT OR REPLACE INTO rollup_sync VALUES (?, ?, ?, ?)",
+                                   (tool.key, bucket.label, to_epoch(synced_from), to_epoch(end)))
+            self._coverage[(tool.key, bucket.label)] = (synced_from, end)
+        self.rows_synced += len(frame)
+
+    def prune(self, tool, bucket: TimeBucket, cutoff: datetime):
+        """Drop rows older than the retention period."""
+        key = (tool.key, bucket.label)
+        with self._lock:
+            connection = self._connect()
+            coverage = self._coverage.get(key)
+            if coverage is None or coverage[0] >= cutoff:
+                return
+            with connection:
+                connection.execute(f"DELETE FROM {self._table(tool.key, bucket)} WHERE {quote(TIME_COLUMN)} < ?",
+                                   (to_epoch(cutoff),))
+                connection.execute("UPDATE rollup_sync SET synced_from = ? WHERE tool = ? AND bucket = ?",
+                                   (to_epoch(cutoff), tool.key, bucket.label))
+            self._coverage[key] = (cutoff, coverage[1])
+
+    async def sync(self, tools: Iterable):
+        """Append every bucket that settled since the last sync, oldest first."""
+        now = datetime.now(timezone.utc)
+        for tool in tools:
+            for bucket in STORED_BUCKETS:
+                sealed_until = bucket.floor(now - self.settle)
+                oldest = bucket.floor(now - self.retention[bucket.label])
+                with self._lock:
+                    self._connect()
+                    coverage = self._coverage.get((tool.key, bucket.label))
+                begin = coverage[1] if coverage is not None else oldest
+                while begin < sealed_until:
+                    end = min(begin + SYNC_CHUNKS[bucket.label], sealed_until)
+                    frame = await tool.query_rollup(bucket, begin, end)
+                    await asyncio.to_thread(self.append, tool, bucket, frame, begin, end)
+                    logging.info(f"Rolled up {len(frame)} {bucket.label} rows of {tool.key} from {begin} to {end}")
+                    begin = end
+                await asyncio.to_thread(self.prune, tool, bucket, oldest)
+        self.syncs += 1
+        self.last_sync = now
+
+    def start(self, tools: Iterable):
+        if not self.enabled or self._task is not None:
+            return
+        tools = list(tools)
+
+        async def run():
+            while True:
+                try:
+                    await self.sync(tools)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Whatever was appended is kept; the next run continues from there
+                    self.sync_errors += 1
+                    logging.error(f"Rollup sync failed: {e}")
+                await asyncio.sleep(self.sync_interval)
+
+        self._task = asyncio.ensure_future(run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "coverage": {
+                f"{tool_key}/{label}": {"from": start.isoformat(), "until": end.isoformat()}
+                for (tool_key, label), (start, end) in sorted(self._coverage.items())
+            },
+            "reads": self.reads,
+            "rows_served": self.rows_served,
+            "rows_synced": self.rows_synced,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+        }
+
+
+@lru_cache()
+def get_rollup_store() -> RollupStore:
+    settings = get_settings()
+    return RollupStore(
+        settings.ROLLUP_DB_PATH,
+        settings.ORGANIZATION_ID,
+        settings.ENVIRONMENT_ID,
+        retention_days={"1h": settings.ROLLUP_HOURLY_RETENTION_DAYS, "1d": settings.ROLLUP_DAILY_RETENTION_DAYS},
+        settle_seconds=settings.TOOL_CACHE_SETTLE_SECONDS,
+        sync_interval_seconds=settings.ROLLUP_SYNC_INTERVAL_SECONDS,
+        enabled=settings.ROLLUP_ENABLED,
+    )
@@ -0,0 +1,99 @@
+from app.core.metrics import COALESCED_CALLS
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import hashlib
+import json
+import logging
+
+T = TypeVar("T")
+
+
+def request_key(*parts) -> str:
+    """Stable key for a request made of JSON-serializable parts (prompts, parameters)."""
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight execution.
+
+    The first caller starts the call; callers arriving while it runs await
+    the same task and get the same result (or exception). A caller that is
+    cancelled (client disconnect, timeout) leaves the call running for the
+    others; once the last one is gone the call itself is cancelled, so e.g.
+    its Kusto query is cancelled on the server. Nothing is kept once the call
+    finishes, so this only removes duplicate work that overlaps in time.
+    Shared results must not be mutated by the callers.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _Flight(asyncio.ensure_future(call()))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            # The outcome is delivered to the callers; a task nobody awaits anymore must not warn
+            flight.task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            COALESCED_CALLS.labels(group=self.name).inc()
+            logging.info(f"Joined an in-flight {self.name} call")
+
+        flight.waiters += 1
+        try:
+            # One caller going away must not cancel the call for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # The last caller went away; nobody needs the result anymore
+                self.abandoned += 1
+                self._forget(key, flight)
+                logging.info(f"Cancelling an abandoned {self.name} call")
+                flight.task.cancel()
+                # Let the call's own cleanup (e.g. Kusto query cancellation) run first
+                await asyncio.wait([flight.task])
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        # A later call with the same key may already be in flight
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._calls),
+        }
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def single_flight_stats() -> dict:
+    return {name: group.stats() for name, group in sorted(_groups.items())}
@@ -3,17 +3,75 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 from pathlib import Path
+import asyncio
+import logging
 
 from app.config import get_settings
+from app.core.analyzer_pool import get_analyzer_pool
+from app.core.api_catalog import get_api_catalog
+from app.core.insight_engine import get_insight_engine
+from app.core.kusto_client import get_kusto_manager
+from app.core.log_config import RequestLoggingMiddleware, configure_logging
+from app.core.metrics import ServerTimingMiddleware
+from app.core.prompt_budget import get_prompt_governor
+from app.core.rollup_store import get_rollup_store
+from app.tools.registry import get_tool_registry
 from app.api.routes import query
 from app.api.routes import tools
 from app.api.routes import chat
 from app.api.routes import health
+from app.api.routes import stats
+from app.api.routes import charts
+from app.api.routes import metrics
+
+
+async def warm_api_catalog():
+    # Warm the API catalog so the first request doesn't pay for the scan; data
+    # extraction reads the deployment's APIs, API identification the organization's
+    catalog_keys = [(settings.ORGANIZATION_ID, settings.ENVIRONMENT_ID), (settings.ORGANIZATION_ID, None)]
+    results = await asyncio.gather(*(get_api_catalog().warm(*key) for key in catalog_keys), return_exceptions=True)
+    for key, result in zip(catalog_keys, results):
+        if isinstance(result, Exception):
+            logging.warning(f"API catalog warm-up failed for {key}, it will load on first use: {result}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and validate the tool definitions; a broken one should stop startup
+    get_tool_registry()
+
+    # Start the analyzer workers in the background while the rest warms up
+    get_analyzer_pool().start()
+
+    # Open the Kusto connection pool; the token and warm-up query follow in the
+    # background and /health reports not ready until they succeed
+    await get_kusto_manager().start()
+
+    # Warm the API catalog in the background; an unreachable cluster must not
+    # keep /health and the routes that don't need Kusto from serving
+    catalog_warmup = asyncio.ensure_future(warm_api_catalog())
+
+    # Load the tokenizer now; it may need to download its encoding file
+    await asyncio.to_thread(get_prompt_governor().count_tokens, "")
+
+    # Load chart fonts for the built-in analyses
+    await asyncio.to_thread(get_insight_engine().warm)
+
+    # Keep the local rollups in step with Kusto; the first run backfills them
+    get_rollup_store().start(get_tool_registry().tools.values())
+    yield
+    catalog_warmup.cancel()
+    await get_rollup_store().stop()
+    await get_analyzer_pool().stop()
+    await get_kusto_manager().stop()
+
 
 # Initialize FastAPI app
 settings = get_settings()
-app = FastAPI(title=settings.API_TITLE)
+configure_logging()
+app = FastAPI(title=settings.API_TITLE, lifespan=lifespan)
 
 
 # Add CORS middleware
@@ -23,8 +81,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
+# Per-stage timings of each request in a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
+
+# Request IDs on log lines and per-request verbose payload logging
+app.add_middleware(RequestLoggingMiddleware)
+
 # Mount templates
 templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
 
@@ -32,4 +97,7 @@ templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
 app.include_router(query.router)
 app.include_router(tools.router)
 app.include_router(chat.router)
-app.include_router(health.router)  
\ No newline at end of file
+app.include_router(health.router)
+app.include_router(stats.router)
+app.include_router(charts.router)
+app.include_router(metrics.router)  
\ No newline at end of file
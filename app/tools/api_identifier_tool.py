@@ -1,45 +1,25 @@
-from app.core.kusto_client import get_kusto_client
+from app.core.api_catalog import get_api_catalog
+from app.core.llm_clients import get_openai_client
 from app.config import get_settings
 from fastapi import HTTPException
-from openai import OpenAI
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-def get_api_identifier_summary(organization_id: str, user_query: str):
+async def get_api_identifier_summary(organization_id: str, user_query: str):
     try:
         logging.info("Starting get_api_identifier_summary function")
 
-        client = get_kusto_client()
         settings = get_settings()
-        logging.info("Retrieved settings and Kusto client")
+        logging.info("Retrieved settings")
 
         # Get all APIs
-        query = f"""
-        analytics_response_code_summary
-        | where customerId == '{organization_id}'
-        | summarize by apiId, apiName
-        """
-        logging.info(f"Executing Kusto query: {query}")
-
-        response = client.execute(settings.KUSTO_DATABASE_NAME, query)
-        results = response.primary_results[0]
-        logging.info("Received response from Kusto client")
-
-        apis = []
-        for row in results:
-            apis.append({
-                "apiId": row["apiId"],
-                "apiName": row["apiName"]
-            })
-        logging.info(f"Retrieved APIs: {apis}")
+        apis = await get_api_catalog().get_apis(organization_id)
+        logging.info(f"Retrieved {len(apis)} APIs")
 
         # Use OpenAI to determine the most matching API
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_openai_client()
         logging.info("Initialized OpenAI client")
 
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=settings.OPEN_AI_MODEL,
             messages=[
                 {
@@ -1,29 +1,23 @@
-from app.core.kusto_client import get_kusto_client
+from app.core.api_catalog import get_api_catalog
+from app.core.llm_clients import coalesced_openai_completion
+from app.core.query_scheduler import QueryRejected
 from app.config import get_settings
 from fastapi import HTTPException
-from openai import OpenAI
 from pydantic import BaseModel
 import datetime
 import json
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 class DataExtractionRequest(BaseModel):
     user_query: str
 
-def extract_data(request: DataExtractionRequest):
+async def extract_data(request: DataExtractionRequest):
     try:
         settings = get_settings()
         organization_id = settings.ORGANIZATION_ID
         environment_id =  settings.ENVIRONMENT_ID
         logging.info(f"Starting data extraction for org: {organization_id}")
         
-        # Initialize clients and settings
-        kusto_client = get_kusto_client()
-        settings = get_settings()
-        
         #  Get environments and APIs data from Kusto
         # environments_query = f"""
         # analytics_response_code_summary
@@ -32,26 +26,19 @@ def extract_data(request: DataExtractionRequest):
         # | order by keyType asc
         # """
         
-        apis_query = f"""
-        analytics_response_code_summary
-        | where customerId == '{organization_id}' and deploymentId == '{environment_id}'
-        | summarize by apiId, apiName
-        """
-        
         # Execute queries
         # env_response = kusto_client.execute(settings.KUSTO_DATABASE_NAME, environments_query)
-        api_response = kusto_client.execute(settings.KUSTO_DATABASE_NAME, apis_query)
+        apis = await get_api_catalog().get_apis(organization_id, environment_id)
         
         # Process results
         # environments = [row["keyType"] for row in env_response.primary_results[0]]
-        apis = [{"apiId": row["apiId"], "apiName": row["apiName"]} 
-               for row in api_response.primary_results[0]]
         
-        current_time = datetime.datetime.now()
+        # Minute precision is plenty for resolving "yesterday" and lets identical questions share one call
+        current_time = datetime.datetime.now().replace(second=0, microsecond=0)
         
         # Single LLM call to extract all information
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        response = await coalesced_openai_completion(
+            "extract_data",
             model=settings.OPEN_AI_MODEL,
             messages=[
                 {
@@ -95,10 +82,12 @@ def extract_data(request: DataExtractionRequest):
         extracted_data["api"]["apiList"] = apis
         # logging.info(f"Extracted environment: {extracted_data['environment']}")
         logging.info(f"Extracted time range: {extracted_data['timeRange']}")
-        logging.info(f"Extracted API details: {extracted_data['api']}")
+        logging.info(f"Extracted API: {extracted_data['api'].get('apiName')} ({extracted_data['api'].get('apiId')}), {len(apis)} APIs available")
         logging.info("Data extraction completed successfully")
         return extracted_data
 
+    except QueryRejected as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logging.error(f"An error occurred in data extraction: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
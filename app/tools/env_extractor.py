@@ -1,19 +1,15 @@
-from app.core.kusto_client import get_kusto_client
+from app.core.kusto_client import execute_kusto_query
+from app.core.llm_clients import get_openai_client
 from app.config import get_settings
 from fastapi import HTTPException
-from openai import OpenAI
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-def get_environment_summary(organization_id: str, user_query: str):
+async def get_environment_summary(organization_id: str, user_query: str):
     try:
         logging.info("Starting get_environment_summary function")
 
-        client = get_kusto_client()
         settings = get_settings()
-        logging.info("Retrieved settings and Kusto client")
+        logging.info("Retrieved settings")
 
         # Get all environments
         query = f"""
@@ -24,7 +20,7 @@ def get_environment_summary(organization_id: str, user_query: str):
         """
         logging.info(f"Executing Kusto query: {query}")
 
-        response = client.execute(settings.KUSTO_DATABASE_NAME, query)
+        response = await execute_kusto_query(query)
         results = response.primary_results[0]
         logging.info("Received response from Kusto client")
 
@@ -32,10 +28,10 @@ def get_environment_summary(organization_id: str, user_query: str):
         logging.info(f"Retrieved environments: {environments}")
 
         # Use OpenAI to determine the most matching environment
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_openai_client()
         logging.info("Initialized OpenAI client")
 
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=settings.OPEN_AI_MODEL,
             messages=[
                 {
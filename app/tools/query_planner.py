@@ -0,0 +1,30 @@
+from app.api.routes.tools import select_tools, ToolRequest
+from app.tools.data_extractor import extract_data, DataExtractionRequest
+from app.core.metrics import timed_await
+import asyncio
+import logging
+
+async def plan_query(user_query: str):
+    logging.info("Starting query planning")
+
+    # Data extraction and tool selection don't depend on each other,
+    # so issue both LLM calls at once instead of back to back.
+    # If one fails the other's result is of no use, so it is cancelled too.
+    tasks = [
+        asyncio.ensure_future(timed_await("extract_data", extract_data(DataExtractionRequest(user_query=user_query)))),
+        asyncio.ensure_future(timed_await("select_tools", select_tools(ToolRequest(user_query=user_query))))
+    ]
+    try:
+        extracted_data, tools_response = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    plan = {
+        "timeRange": extracted_data["timeRange"],
+        "api": extracted_data["api"],
+        "selected_tools": tools_response["selected_tools"]
+    }
+    logging.info(f"Planned tools: {plan['selected_tools']}")
+    return plan
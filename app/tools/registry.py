@@ -0,0 +1,286 @@
+from app.config import get_settings
+from app.core.dataset import TIME_COLUMN, concat_frames, frame_from_result_table, frame_size
+from app.core.kusto_client import execute_kusto_query
+from app.core.metrics import BYTES_MOVED, ROWS_FETCHED, TOOL_SECONDS, timed
+from app.core.query_scheduler import QueryRejected
+from app.core.result_cache import get_tool_cache
+from app.core.rollup_store import get_rollup_store
+from app.core.single_flight import get_single_flight
+from app.utils.query_helper import TimeBucket, bucket_window, format_kql_datetime
+from dataclasses import dataclass, field
+from datetime import datetime
+from fastapi import HTTPException
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import pandas as pd
+
+TOOL_DETAILS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_details.json")
+SCHEMA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "schemas"))
+
+REQUIRED_FIELDS = ("name", "key", "description", "schema", "columns", "query")
+QUERY_PLACEHOLDERS = {"start_time", "end_time", "organization_id", "environment_id", "api_filter", "bucket"}
+
+# apiName value meaning "no specific API"
+NO_API = "NoData"
+
+
+def kql_string(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """A data tool declared in tool_details.json."""
+    name: str
+    key: str
+    description: str
+    endpoint: Optional[str]
+    columns: Tuple[str, ...]
+    renames: Dict[str, str]
+    query_template: str
+    schema: list = field(compare=False)
+    # Measures that may be summed into larger buckets
+    rollup_sum: Tuple[str, ...] = ()
+
+    def build_query(self, api_name: str, bucket: TimeBucket, window_start: datetime, window_end: datetime) -> str:
+        settings = get_settings()
+        api_filter = f"| where apiName == '{kql_string(api_name)}'" if api_name != NO_API else ""
+        return self.query_template.format(
+            start_time=format_kql_datetime(window_start),
+            end_time=format_kql_datetime(window_end),
+            organization_id=settings.ORGANIZATION_ID,
+            environment_id=settings.ENVIRONMENT_ID,
+            api_filter=api_filter,
+            bucket=bucket.kql(),
+        )
+
+    async def query_window(self, api_name: str, bucket: TimeBucket, window_start: datetime, window_end: datetime) -> pd.DataFrame:
+        query = self.build_query(api_name, bucket, window_start, window_end)
+        logging.info(f"{self.name} query: {query}")
+
+        response = await execute_kusto_query(query)
+        results = response.primary_results[0]
+        logging.info(f"{self.name} received {len(results)} rows from Kusto")
+
+        frame = frame_from_result_table(results, list(self.columns), renames=self.renames, bucket_size=bucket.label)
+        ROWS_FETCHED.labels(tool=self.key).inc(len(frame))
+        BYTES_MOVED.labels(kind="kusto").inc(frame_size(frame))
+        return frame
+
+    async def fetch(self, api_name: str, start_time, end_time, bucket: Optional[TimeBucket] = None) -> pd.DataFrame:
+        """Data of `api_name` in [start_time, end_time); identical concurrent fetches share one execution."""
+        settings = get_settings()
+
+        # Aggregate into time buckets on the cluster instead of shipping raw windows
+        bucket, window_start, window_end = bucket_window(start_time, end_time, bucket)
+        logging.info(f"{self.name}: {bucket.label} buckets from {window_start} to {window_end}")
+
+        flight_key = (self.key, settings.ORGANIZATION_ID, settings.ENVIRONMENT_ID, api_name, bucket.label,
+                      window_start, window_end)
+        return await get_single_flight("tools").do(
+            flight_key, lambda: self.fetch_window(api_name, bucket, window_start, window_end)
+        )
+
+    async def fetch_window(self, api_name: str, bucket: TimeBucket, window_start: datetime, window_end: datetime) -> pd.DataFrame:
+        settings = get_settings()
+
+        # Closed buckets come from the cache, only gaps and the open tail hit Kusto
+        cache_key = (self.key, settings.ORGANIZATION_ID, settings.ENVIRONMENT_ID, api_name, bucket.label)
+
+        def from_cache(start: datetime, end: datetime):
+            return get_tool_cache().fetch(
+                cache_key, bucket, start, end, lambda gap_start, gap_end: self.query_window(api_name, bucket, gap_start, gap_end)
+            )
+
+        # Settled buckets come from the local rollups where the bucket size allows;
+        # what lies before (past the retention) or after them goes through the cache
+        rollup_store = get_rollup_store()
+        stored = rollup_store.servable(self, bucket, window_start, window_end)
+        if stored is None:
+            return await from_cache(window_start, window_end)
+
+        parts = [asyncio.to_thread(rollup_store.read, self, bucket, None if api_name == NO_API else api_name, *stored)]
+        if window_start < stored[0]:
+            parts.insert(0, from_cache(window_start, stored[0]))
+        if stored[1] < window_end:
+            parts.append(from_cache(stored[1], window_end))
+        frames = await asyncio.gather(*parts)
+        logging.info(f"{self.name}: rows from {stored[0]} to {stored[1]} served from rollups")
+        return concat_frames(list(frames))
+
+    async def query_rollup(self, bucket: TimeBucket, window_start: datetime, window_end: datetime) -> pd.DataFrame:
+        # Rollups hold every API; requests filter them locally
+        return await self.query_window(NO_API, bucket, window_start, window_end)
+
+
+def load_tool_spec(entry: dict, schema_dir: str) -> ToolSpec:
+    missing = [name for name in REQUIRED_FIELDS if not entry.get(name)]
+    if missing:
+        raise ValueError(f"Tool {entry.get('name', '?')} is missing {', '.join(missing)}")
+    name = entry["name"]
+
+    columns = tuple(entry["columns"])
+    if TIME_COLUMN not in columns or "bucketSize" not in columns:
+        raise ValueError(f"Tool {name} must return {TIME_COLUMN} and bucketSize columns")
+
+    query = entry["query"]
+    query_template = "\n".join(query) if isinstance(query, list) else query
+    placeholders = {parsed[1] for parsed in Formatter().parse(query_template) if parsed[1] is not None}
+    unknown = placeholders - QUERY_PLACEHOLDERS
+    if unknown:
+        raise ValueError(f"Tool {name} query uses unknown placeholders: {', '.join(sorted(unknown))}")
+    if "bucket" not in placeholders:
+        raise ValueError(f"Tool {name} query must summarize by {{bucket}}")
+
+    rollup_sum = tuple(entry.get("rollup_sum", []))
+    if set(rollup_sum) - set(columns):
+        raise ValueError(f"Tool {name} sums rollup columns it does not return: {', '.join(set(rollup_sum) - set(columns))}")
+
+    schema_path = os.path.join(schema_dir, entry["schema"])
+    with open(schema_path, "r", encoding="utf-8") as schema_file:
+        schema = json.load(schema_file)
+    for record in (record for sample in schema for record in sample):
+        if set(record) != set(columns):
+            raise ValueError(f"Schema {entry['schema']} does not match the columns of {name}")
+
+    return ToolSpec(
+        name=name,
+        key=entry["key"],
+        description=entry["description"],
+        endpoint=entry.get("endpoint"),
+        columns=columns,
+        renames=dict(entry.get("renames", {})),
+        query_template=query_template,
+        schema=schema,
+        rollup_sum=rollup_sum,
+    )
+
+
+class ToolRegistry:
+    """
+    Data tools declared in tool_details.json, loaded and validated once.
+
+    Each tool declares its description (used for tool selection), its KQL
+    template, the columns it returns and the schema shown to the code
+    generator. Adding a data source only needs a new entry and schema file.
+    """
+
+    def __init__(self, tools: List[ToolSpec]):
+        self.tools: Dict[str, ToolSpec] = {}
+        for tool in tools:
+            if tool.name in self.tools or any(existing.key == tool.key for existing in self.tools.values()):
+                raise ValueError(f"Tool {tool.name} ({tool.key}) is declared twice")
+            self.tools[tool.name] = tool
+
+    @classmethod
+    def load(cls, path: str = TOOL_DETAILS_PATH, schema_dir: str = SCHEMA_DIR) -> "ToolRegistry":
+        with open(path, "r", encoding="utf-8") as details_file:
+            entries = json.load(details_file)
+        registry = cls([load_tool_spec(entry, schema_dir) for entry in entries])
+        logging.info(f"Loaded {len(registry.tools)} tools from {path}")
+        return registry
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def get(self, name: str) -> ToolSpec:
+        return self.tools[name]
+
+    def describe(self) -> List[dict]:
+        # What the tool selection prompt gets to see
+        return [
+            {"name": tool.name, "description": tool.description, "endpoint": tool.endpoint}
+            for tool in self.tools.values()
+        ]
+
+    async def run(self, names: List[str], api_name: str, start_time, end_time,
+                  bucket: Optional[TimeBucket] = None, semaphore: Optional[asyncio.Semaphore] = None) -> List[pd.DataFrame]:
+        """
+        Fetch data from several tools concurrently; results come back in the
+        order of `names`. Without a `bucket` the size follows the time range.
+        Callers spreading one request over several calls pass a shared
+        `semaphore` so the fan-out limit holds across them.
+        """
+        settings = get_settings()
+        # Bound the number of Kusto queries a single request may have in flight
+        semaphore = semaphore or asyncio.Semaphore(settings.CHAT_MAX_TOOL_FANOUT)
+
+        async def run_tool(name: str):
+            async with semaphore:
+                logging.info(f"Executing tool: {name}")
+                try:
+                    with timed(self.tools[name].key, TOOL_SECONDS, "tool"):
+                        return await asyncio.wait_for(
+                            self.tools[name].fetch(api_name, start_time, end_time, bucket),
+                            timeout=settings.TOOL_TIMEOUT_SECONDS
+                        )
+                except asyncio.TimeoutError:
+                    logging.error(f"{name} timed out after {settings.TOOL_TIMEOUT_SECONDS} seconds")
+                    raise HTTPException(status_code=504, detail=f"{name} did not return data within {settings.TOOL_TIMEOUT_SECONDS} seconds")
+                except QueryRejected as e:
+                    raise HTTPException(status_code=503, detail=str(e))
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    logging.error(f"An error occurred in {name}: {e}")
+                    raise HTTPException(status_code=500, detail=str(e))
+
+        tasks = [asyncio.ensure_future(run_tool(name)) for name in names]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+class SharedFetches:
+    """
+    Tool fetches shared by the questions of one batch: each (tool, API,
+    bucket window) is fetched once however many questions need it, also
+    when they ask at different times. Drop-in for ToolRegistry.run.
+    """
+
+    def __init__(self, registry: ToolRegistry):
+        self.registry = registry
+        self._fetches: Dict[tuple, asyncio.Future] = {}
+        # The whole batch stays within the fan-out limit of a single request
+        self._semaphore = asyncio.Semaphore(get_settings().CHAT_MAX_TOOL_FANOUT)
+        self.requested = 0
+
+    async def run(self, names: List[str], api_name: str, start_time, end_time,
+                  bucket: Optional[TimeBucket] = None) -> List[pd.DataFrame]:
+        async def fetch(name: str) -> pd.DataFrame:
+            window_bucket, window_start, window_end = bucket_window(start_time, end_time, bucket)
+            key = (self.registry.get(name).key, api_name, window_bucket.label, window_start, window_end)
+            self.requested += 1
+            task = self._fetches.get(key)
+            if task is None:
+                task = self._fetches[key] = asyncio.ensure_future(
+                    self.registry.run([name], api_name, start_time, end_time, bucket, self._semaphore)
+                )
+            # One question giving up must not cancel the fetch for the others
+            return (await asyncio.shield(task))[0]
+
+        return list(await asyncio.gather(*(fetch(name) for name in names)))
+
+    def close(self):
+        for task in self._fetches.values():
+            if not task.done():
+                task.cancel()
+            else:
+                # Failures were reported to the questions that needed the data
+                task.cancelled() or task.exception()
+
+    def stats(self) -> dict:
+        return {"requested": self.requested, "executed": len(self._fetches)}
+
+
+@lru_cache()
+def get_tool_registry() -> ToolRegistry:
+    return ToolRegistry.load()
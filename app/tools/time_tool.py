@@ -1,17 +1,14 @@
-from openai import OpenAI
 from app.config import get_settings
+from app.core.llm_clients import get_openai_client
 from fastapi import HTTPException
 from pydantic import BaseModel
 import datetime
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 class TimeRequest(BaseModel):
     user_query: str
 
-def get_time_data(request: TimeRequest):
+async def get_time_data(request: TimeRequest):
     try:
         logging.info("Starting get_time_data function")
 
@@ -19,14 +16,14 @@ def get_time_data(request: TimeRequest):
         settings = get_settings()
         logging.info("Retrieved settings")
 
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)  # Set the API key
+        client = get_openai_client()
         logging.info("Initialized OpenAI client")
 
         current_time = datetime.datetime.now()
         logging.info(f"Current time: {current_time}")
 
         # Use the correct method to determine the start and end times
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=settings.OPEN_AI_MODEL,
             messages=[
                 {
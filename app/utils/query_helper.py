@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple, Union
+
+# Fixed-width buckets are anchored on a Monday so weekly buckets line up with
+# calendar weeks. The same anchor is passed to bin_at() so Python and Kusto agree
+# on bucket boundaries.
+BUCKET_ANCHOR = datetime(1970, 1, 5, tzinfo=timezone.utc)
+
+
+def to_utc(value: Union[str, datetime]) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def format_kql_datetime(value: datetime) -> str:
+    return to_utc(value).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@dataclass(frozen=True)
+class TimeBucket:
+    label: str
+    span: Optional[timedelta]  # None means calendar months
+
+    def kql(self, column: str = "AGG_WINDOW_START_TIME") -> str:
+        if self.span is None:
+            return f"startofmonth({column})"
+        return f"bin_at({column}, {self.label}, datetime({format_kql_datetime(BUCKET_ANCHOR)}))"
+
+    def floor(self, value: datetime) -> datetime:
+        value = to_utc(value)
+        if self.span is None:
+            return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return BUCKET_ANCHOR + ((value - BUCKET_ANCHOR) // self.span) * self.span
+
+    def next(self, bucket_start: datetime) -> datetime:
+        if self.span is None:
+            if bucket_start.month == 12:
+                return bucket_start.replace(year=bucket_start.year + 1, month=1)
+            return bucket_start.replace(month=bucket_start.month + 1)
+        return bucket_start + self.span
+
+    def ceil(self, value: datetime) -> datetime:
+        value = to_utc(value)
+        floored = self.floor(value)
+        return floored if floored == value else self.next(floored)
+
+
+HOURLY = TimeBucket("1h", timedelta(hours=1))
+DAILY = TimeBucket("1d", timedelta(days=1))
+THREE_DAYS = TimeBucket("3d", timedelta(days=3))
+FIVE_DAYS = TimeBucket("5d", timedelta(days=5))
+WEEKLY = TimeBucket("7d", timedelta(days=7))
+MONTHLY = TimeBucket("1mo", None)
+
+
+def select_bucket(start_time: Union[str, datetime], end_time: Union[str, datetime]) -> TimeBucket:
+    # Mirrors the charting rules given to the code generator:
+    # a. two days or less -> hours
+    # b. up to two weeks -> days
+    # c. up to a month -> 3 to 5 days
+    # d. up to three months -> weeks
+    # e. longer -> months
+    span = to_utc(end_time) - to_utc(start_time)
+    if span <= timedelta(days=2):
+        return HOURLY
+    if span <= timedelta(days=14):
+        return DAILY
+    if span <= timedelta(days=21):
+        return THREE_DAYS
+    if span <= timedelta(days=31):
+        return FIVE_DAYS
+    if span <= timedelta(days=92):
+        return WEEKLY
+    return MONTHLY
+
+
+def forecast_bucket(start_time: Union[str, datetime], end_time: Union[str, datetime]) -> TimeBucket:
+    # Forecasting needs more points than a chart can show: hours for up to a
+    # week of history (a daily season), days beyond that (a weekly season)
+    if to_utc(end_time) - to_utc(start_time) <= timedelta(days=7):
+        return HOURLY
+    return DAILY
+
+
+def bucket_window(start_time: Union[str, datetime], end_time: Union[str, datetime],
+                  bucket: Optional[TimeBucket] = None) -> Tuple[TimeBucket, datetime, datetime]:
+    """Pick a bucket for the range (unless given) and widen the range to whole buckets (at least one)."""
+    bucket = bucket or select_bucket(start_time, end_time)
+    window_start, window_end = bucket.floor(start_time), bucket.ceil(end_time)
+    if window_end <= window_start:
+        window_end = bucket.next(window_start)
+    return bucket, window_start, window_end
+
+
+def bucket_starts(bucket: TimeBucket, window_start: datetime, window_end: datetime) -> List[datetime]:
+    """Start of every bucket in [window_start, window_end), empty ones included."""
+    starts = []
+    current = bucket.floor(window_start)
+    while current < window_end:
+        starts.append(current)
+        current = bucket.next(current)
+    return starts
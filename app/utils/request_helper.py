@@ -0,0 +1,43 @@
+from fastapi import HTTPException, Request
+from typing import Awaitable, TypeVar
+import asyncio
+import logging
+
+T = TypeVar("T")
+
+# Non-standard status (nginx) for requests the client gave up on
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_for_disconnect(request: Request):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    Only streaming responses notice disconnects on their own; without this an
+    abandoned request keeps its Kusto queries and LLM calls running. Must be
+    called after the request body has been read.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        watcher.cancel()
+        raise
+    watcher.cancel()
+
+    if not task.done():
+        logging.info(f"Client disconnected, cancelling {request.method} {request.url.path}")
+        task.cancel()
+        # Let the task's own cleanup (e.g. Kusto query cancellation) run first
+        await asyncio.gather(task, return_exceptions=True)
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    return task.result()
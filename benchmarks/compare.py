@@ -0,0 +1,69 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/latest.json
+
+Exits with status 1 when any scenario's p95 latency grew, or its throughput
+fell, by more than the threshold.
+"""
+from typing import List, Tuple
+import argparse
+import json
+import sys
+
+
+def scenario_key(result: dict) -> Tuple[str, int, int]:
+    return result["endpoint"], result["rows"], result["concurrency"]
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Return report lines and the subset describing regressions."""
+    previous = {scenario_key(result): result for result in baseline["results"]}
+    lines, regressions = [], []
+    header = f"{'endpoint':<8} {'rows':>7} {'conc':>5} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'req/s':>14}"
+    lines.append(header)
+    for result in current["results"]:
+        before = previous.get(scenario_key(result))
+        if before is None:
+            continue
+
+        def cell(metric: str) -> str:
+            return f"{result[metric]:>8} {change(before[metric], result[metric]):+6.0%}"
+
+        line = (f"{result['endpoint']:<8} {result['rows']:>7} {result['concurrency']:>5} "
+                f"{cell('p50_ms'):>16} {cell('p95_ms'):>16} {cell('p99_ms'):>16} {cell('throughput_rps'):>14}")
+        lines.append(line)
+        slower = change(before["p95_ms"], result["p95_ms"]) > threshold
+        fewer = change(before["throughput_rps"], result["throughput_rps"]) < -threshold
+        more_errors = result["errors"] > before["errors"]
+        if slower or fewer or more_errors:
+            regressions.append(line)
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative change (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.current, "r", encoding="utf-8") as current_file:
+        current = json.load(current_file)
+
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}:")
+        print("\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
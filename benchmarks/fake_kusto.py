@@ -0,0 +1,185 @@
+"""
+In-process stand-in for the async Kusto client.
+
+Queries are answered with synthetic analytics_*_summary rows, encoded as
+real v2 response frames so the service parses them exactly as it would a
+cluster response. The number of rows per query and the added latency are
+configurable.
+"""
+from azure.kusto.data.aio.response import KustoStreamingResponseDataSet
+from azure.kusto.data.aio.streaming_response import JsonTokenReader, StreamingDataSetEnumerator
+from azure.kusto.data.response import KustoResponseDataSetV2
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+import asyncio
+import io
+import json
+import random
+import re
+
+API_NAMES = [f"api-{index:02d}" for index in range(12)]
+RESPONSE_CODES = ["200", "201", "204", "400", "401", "404", "429", "500", "502", "503"]
+TABLE_NAMES = ["analytics_proxy_error_summary", "analytics_response_code_summary", "analytics_target_response_summary"]
+ERROR_TYPES = [("TARGET_CONNECTIVITY", "Connection refused"), ("THROTTLED", "Quota exceeded"),
+               ("AUTH", "Invalid credentials"), ("TIMEOUT", "Backend timed out")]
+
+# Result shapes of the service's queries, picked by a marker in the query text.
+# The last one answers anything else, e.g. ad hoc /query requests.
+SHAPES = [
+    ("summarize by apiId, apiName", [("apiId", "string"), ("apiName", "string")]),
+    ("analytics_proxy_error_summary", [
+        ("AGG_WINDOW_START_TIME", "datetime"), ("apiName", "string"), ("hitCount", "long"),
+        ("errorType", "string"), ("errorMessage", "string")]),
+    ("totalHits", [
+        ("AGG_WINDOW_START_TIME", "datetime"), ("totalHits", "long"), ("proxyResponseCode", "string"),
+        ("apiName", "string"), ("deploymentId", "string")]),
+    ("analytics_target_response_summary", [
+        ("AGG_WINDOW_START_TIME", "datetime"), ("apiName", "string"), ("p95_latency", "real"),
+        ("avg_latency", "real"), ("hitCount", "long")]),
+    ("print 1", [("print_0", "long")]),
+    (".show tables", [("TableName", "string"), ("DatabaseName", "string")]),
+    ("", [
+        ("AGG_WINDOW_START_TIME", "datetime"), ("customerId", "string"), ("deploymentId", "string"),
+        ("apiId", "string"), ("apiName", "string"), ("proxyResponseCode", "string"), ("hitCount", "long")]),
+]
+
+DATETIME_PATTERN = re.compile(r"datetime\((\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z)\)")
+
+
+def shape_for(query: str) -> List[Tuple[str, str]]:
+    return next(columns for marker, columns in SHAPES if marker in query)
+
+
+def query_window(query: str) -> Tuple[datetime, datetime]:
+    # Tool queries carry their window as datetime literals; anything else gets the last day
+    found = [datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+             for value in DATETIME_PATTERN.findall(query)]
+    if len(found) >= 2:
+        return found[0], found[1]
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return end - timedelta(days=1), end
+
+
+def synthetic_value(column: str, column_type: str, index: int, start: datetime, step: float, rng: random.Random):
+    if column == "AGG_WINDOW_START_TIME":
+        return (start + timedelta(seconds=index * step)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    if column in ("apiName", "apiId"):
+        api = API_NAMES[index % len(API_NAMES)]
+        return api if column == "apiName" else f"id-{api}"
+    if column == "proxyResponseCode":
+        return RESPONSE_CODES[rng.randrange(len(RESPONSE_CODES))]
+    if column == "errorType":
+        return ERROR_TYPES[index % len(ERROR_TYPES)][0]
+    if column == "errorMessage":
+        return ERROR_TYPES[index % len(ERROR_TYPES)][1]
+    if column == "TableName":
+        return TABLE_NAMES[index % len(TABLE_NAMES)]
+    if column == "customerId":
+        return "bench-org"
+    if column == "deploymentId":
+        return "bench-env"
+    if column == "DatabaseName":
+        return "bench-db"
+    if column_type == "long":
+        return rng.randint(1, 5000)
+    if column_type == "real":
+        return round(rng.uniform(5, 900), 3)
+    return f"{column}-{index}"
+
+
+def synthetic_rows(query: str, row_count: int, seed: int = 0) -> Tuple[List[Tuple[str, str]], List[list]]:
+    columns = shape_for(query)
+    if columns == [("print_0", "long")]:
+        return columns, [[1]]
+    if columns == SHAPES[0][1]:
+        row_count = len(API_NAMES)
+    elif columns[0][0] == "TableName":
+        row_count = len(TABLE_NAMES)
+
+    start, end = query_window(query)
+    # Rows are spread evenly over the window, in time order like a summarize output
+    step = max((end - start).total_seconds(), 1) / max(row_count, 1)
+    rng = random.Random(seed)
+    rows = [[synthetic_value(name, column_type, index, start, step, rng) for name, column_type in columns]
+            for index in range(row_count)]
+    return columns, rows
+
+
+def v2_frames(columns: List[Tuple[str, str]], rows: List[list]) -> List[dict]:
+    return [
+        {"FrameType": "DataSetHeader", "IsProgressive": False, "Version": "v2.0"},
+        {"FrameType": "DataTable", "TableId": 0, "TableKind": "QueryProperties", "TableName": "@ExtendedProperties",
+         "Columns": [{"ColumnName": "TableId", "ColumnType": "int"}, {"ColumnName": "Key", "ColumnType": "string"},
+                     {"ColumnName": "Value", "ColumnType": "dynamic"}],
+         "Rows": []},
+        {"FrameType": "DataTable", "TableId": 1, "TableKind": "PrimaryResult", "TableName": "PrimaryResult",
+         "Columns": [{"ColumnName": name, "ColumnType": column_type} for name, column_type in columns],
+         "Rows": rows},
+        {"FrameType": "DataSetCompletion", "HasErrors": False, "Cancelled": False},
+    ]
+
+
+class _AsyncBytes:
+    def __init__(self, data: bytes):
+        self._buffer = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+class FakeKustoClient:
+    """Implements the parts of azure.kusto.data.aio.KustoClient the service uses."""
+
+    def __init__(self, rows_per_query: int, latency: float = 0.0, bytes_per_second: float = 0.0):
+        self.rows_per_query = rows_per_query
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.queries = 0
+
+    async def _respond(self, query: str) -> bytes:
+        self.queries += 1
+        columns, rows = synthetic_rows(query, self.rows_per_query, seed=self.queries)
+        payload = json.dumps(v2_frames(columns, rows)).encode("utf-8")
+        # Fixed round trip plus transfer time, so larger results cost more
+        delay = self.latency + (len(payload) / self.bytes_per_second if self.bytes_per_second else 0)
+        await asyncio.sleep(delay)
+        return payload
+
+    async def execute(self, database: str, query: str, properties=None):
+        return KustoResponseDataSetV2(json.loads(await self._respond(query)))
+
+    async def execute_query(self, database: str, query: str, properties=None):
+        return await self.execute(database, query, properties)
+
+    async def execute_mgmt(self, database: str, query: str, properties=None):
+        # Only `.cancel query` reaches here; there is nothing to cancel
+        return None
+
+    async def execute_streaming_query(self, database: str, query: str, properties=None):
+        payload = await self._respond(query)
+        return KustoStreamingResponseDataSet(StreamingDataSetEnumerator(JsonTokenReader(_AsyncBytes(payload))))
+
+    async def close(self):
+        pass
+
+
+def install(rows_per_query: int, latency: float = 0.0, bytes_per_second: float = 0.0) -> FakeKustoClient:
+    """Make the service's Kusto client manager hand out a FakeKustoClient."""
+    from app.core.kusto_client import get_kusto_manager
+
+    client = FakeKustoClient(rows_per_query, latency, bytes_per_second)
+    manager = get_kusto_manager()
+
+    async def start():
+        manager._client = client
+        manager.ready = True
+        manager.warmup_seconds = 0.0
+
+    async def stop():
+        manager._client = None
+        manager.ready = False
+
+    manager.start = start
+    manager.stop = stop
+    manager._client = client
+    return client
@@ -0,0 +1,158 @@
+"""
+Stand-in for the OpenAI and Anthropic APIs.
+
+Serves /v1/chat/completions (plain and streamed) and /v1/messages with
+canned responses shaped like the ones the service expects from each call
+site, after a configurable delay. Point OPENAI_BASE_URL at
+http://host:port/v1 and ANTHROPIC_BASE_URL at http://host:port.
+
+Environment:
+    BENCH_LLM_LATENCY_MS   delay before a response (or its first chunk)
+    BENCH_LLM_TOKEN_MS     delay between streamed chunks
+    BENCH_RANGE_DAYS       length of the time range the extraction call returns
+    BENCH_TOOLS            comma-separated tool names the selection call returns
+"""
+from datetime import date, timedelta
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+LATENCY = float(os.environ.get("BENCH_LLM_LATENCY_MS", "200")) / 1000
+TOKEN_DELAY = float(os.environ.get("BENCH_LLM_TOKEN_MS", "5")) / 1000
+RANGE_DAYS = int(os.environ.get("BENCH_RANGE_DAYS", "7"))
+TOOLS = os.environ.get("BENCH_TOOLS", "Traffic Data Tool, Latency Data Tool")
+
+SUMMARY = (
+    "## Overall Performance | **Traffic** | Traffic stayed steady across the period with a few peaks. | "
+    "**Latency** | Average latency stayed within the usual range. | "
+    "You can see the chart below showing average hits per day. |"
+)
+
+# Works for any combination of tools: totals per numeric column and a daily bar chart
+ANALYZER_CODE = '''```python
+def data_analyzer(data):
+    try:
+        insights = []
+        totals = {}
+        daily = None
+        for tool_name, df in data.items():
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                insights.append(f"No valid data found for {tool_name}")
+                continue
+            numeric = df.select_dtypes(include="number")
+            totals[tool_name] = {column: float(numeric[column].sum()) for column in numeric.columns}
+            insights.append(f"Processed {len(df)} records from {tool_name}")
+            if daily is None and len(numeric.columns):
+                daily = df.set_index("AGG_WINDOW_START_TIME")[numeric.columns[0]].resample("1D").mean()
+        chart = None
+        if daily is not None:
+            plt.figure(figsize=(12, 6))
+            daily.plot(kind="bar")
+            buf = io.BytesIO()
+            plt.savefig(buf, format="png", bbox_inches="tight")
+            plt.close()
+            chart = base64.b64encode(buf.getvalue()).decode("utf-8")
+        return {"error": None, "insights": insights, "chart": chart,
+                "chart_description": "Bar chart of the daily average" if chart else None,
+                "data": {"totals": totals}}
+    except Exception as e:
+        return {"error": f"Analysis failed: {str(e)}", "insights": [], "chart": None, "data": {}}
+```'''
+
+app = FastAPI()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def prompt_text(messages: list) -> str:
+    return " ".join(
+        message["content"] if isinstance(message.get("content"), str) else json.dumps(message.get("content"))
+        for message in messages
+    )
+
+
+def completion_text(body: dict) -> str:
+    # Tell the call sites apart by what they ask for
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        end = date.today()
+        return json.dumps({
+            "timeRange": {"start_time": (end - timedelta(days=RANGE_DAYS)).isoformat(), "end_time": end.isoformat()},
+            "api": {"apiName": "NoData", "apiId": "NoData"},
+        })
+    if "selects specific tools" in prompt_text(body.get("messages", [])):
+        return TOOLS
+    return SUMMARY
+
+
+def openai_usage(prompt: str, text: str) -> dict:
+    prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(text)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy"}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = prompt_text(body.get("messages", []))
+    text = completion_text(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    await asyncio.sleep(LATENCY)
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": openai_usage(prompt, text),
+        }
+
+    def chunk(choices: list, usage=None) -> str:
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                   "model": body.get("model"), "choices": choices, "usage": usage}
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream():
+        words = text.split(" ")
+        for index, word in enumerate(words):
+            content = word if index == 0 else f" {word}"
+            yield chunk([{"index": 0, "delta": {"content": content}, "finish_reason": None}])
+            await asyncio.sleep(TOKEN_DELAY)
+        yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield chunk([], openai_usage(prompt, text))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY)
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model"),
+        "content": [{"type": "text", "text": ANALYZER_CODE}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": estimate_tokens(prompt_text(body.get("messages", []))),
+            "output_tokens": estimate_tokens(ANALYZER_CODE),
+        },
+    }
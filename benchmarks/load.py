@@ -0,0 +1,101 @@
+"""
+Closed-loop load generator: `concurrency` clients each send their next
+request as soon as the previous one finishes, until `requests` requests
+have completed.
+"""
+from typing import Awaitable, Callable, Dict, List
+import asyncio
+import itertools
+import math
+import time
+
+import httpx
+
+QUESTIONS = [
+    "Show me the traffic for the last week",
+    "How did latency change over the last week?",
+    "Compare errors and latency for the last week",
+    "What was the overall performance last week?",
+]
+
+QUERY = "analytics_response_code_summary | order by AGG_WINDOW_START_TIME asc"
+
+
+def chat_request(index: int, unique: bool) -> dict:
+    question = QUESTIONS[index % len(QUESTIONS)]
+    # A unique suffix defeats the analyzer code cache, so every request pays for codegen
+    return {"user_query": f"{question} (#{index})" if unique else question}
+
+
+def endpoint_requests(unique: bool) -> Dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    return {
+        "chat": lambda client, index: client.post("/chat", json=chat_request(index, unique)),
+        "tools": lambda client, index: client.post("/tools", json=chat_request(index, unique)),
+        "query": lambda client, index: client.post("/query", json={"query": QUERY}),
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+async def run_load(base_url: str, endpoint: str, concurrency: int, requests: int,
+                   unique: bool = False, timeout: float = 300) -> dict:
+    send = endpoint_requests(unique)[endpoint]
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            nonlocal errors
+            while (index := next(counter)) < requests:
+                started = time.perf_counter()
+                try:
+                    response = await send(client, index)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed)
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{base_url} did not become healthy within {timeout} seconds")
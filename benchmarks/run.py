@@ -0,0 +1,147 @@
+"""
+Benchmark /chat, /query and /tools offline.
+
+Starts the fake LLM server, then for each data size the service itself
+(benchmarks.serve, with the fake Kusto client returning that many rows per
+query), and drives every endpoint at each concurrency level. Results are
+written as JSON; pass --compare to check them against an earlier run.
+
+    python -m benchmarks.run --rows 100,10000 --concurrency 1,4,16 --requests 40
+"""
+from datetime import datetime, timezone
+from typing import List
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from benchmarks.compare import compare
+from benchmarks.load import run_load, wait_until_healthy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_process(args: List[str], log_path: str, env: dict = None) -> subprocess.Popen:
+    log_file = open(log_path, "ab")
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env={**os.environ, **(env or {})},
+                            stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def run_benchmarks(args) -> dict:
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    service_url = f"http://127.0.0.1:{args.port}"
+    log_path = os.path.join(os.path.dirname(os.path.abspath(args.output)), "benchmark.log")
+    results = []
+
+    llm = start_process(
+        ["-m", "uvicorn", "benchmarks.fake_llm:app", "--port", str(args.llm_port), "--log-level", "warning"],
+        log_path,
+        {"BENCH_LLM_LATENCY_MS": str(args.llm_latency_ms), "BENCH_LLM_TOKEN_MS": str(args.llm_token_ms)}
+    )
+    try:
+        await wait_until_healthy(llm_url)
+        for rows in args.rows:
+            service = start_process(
+                ["-m", "benchmarks.serve", "--port", str(args.port), "--llm-url", llm_url, "--rows", str(rows),
+                 "--kusto-latency-ms", str(args.kusto_latency_ms), "--kusto-mbps", str(args.kusto_mbps)],
+                log_path
+            )
+            try:
+                await wait_until_healthy(service_url)
+                for endpoint in args.endpoints:
+                    # Fill caches, start analyzer workers and open connections before measuring
+                    await run_load(service_url, endpoint, 1, args.warmup, args.unique)
+                    for concurrency in args.concurrency:
+                        summary = await run_load(service_url, endpoint, concurrency, args.requests, args.unique)
+                        result = {"endpoint": endpoint, "rows": rows, "concurrency": concurrency, **summary}
+                        results.append(result)
+                        print(f"{endpoint:<6} rows={rows:<7} concurrency={concurrency:<4} "
+                              f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+                              f"{summary['throughput_rps']} req/s errors={summary['errors']}", flush=True)
+            finally:
+                stop_process(service)
+    finally:
+        stop_process(llm)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "unique_questions": args.unique,
+            "kusto_latency_ms": args.kusto_latency_ms,
+            "kusto_mbps": args.kusto_mbps,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_token_ms": args.llm_token_ms,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), default=["chat", "query", "tools"])
+    parser.add_argument("--rows", type=int_list, default=[100, 10000], help="rows per Kusto query, one run each")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=40, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests per endpoint and data size")
+    parser.add_argument("--unique", action="store_true", help="make every question unique to bypass the code cache")
+    parser.add_argument("--kusto-latency-ms", type=float, default=50)
+    parser.add_argument("--kusto-mbps", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-token-ms", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--llm-port", type=int, default=8101)
+    parser.add_argument("--output", default=None, help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    if args.output is None:
+        args.output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+
+    report = asyncio.run(run_benchmarks(args))
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        lines, regressions = compare(baseline, report, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Run the service against the stand-ins: the in-process fake Kusto client and
+the fake LLM server (benchmarks.fake_llm, started separately).
+
+    python -m benchmarks.serve --port 8100 --llm-url http://127.0.0.1:8101 --rows 1000
+"""
+import argparse
+import os
+import tempfile
+
+# Placeholders for the settings the real clients need; nothing connects with them
+BENCH_ENVIRONMENT = {
+    "KUSTO_CLUSTER_URL": "https://bench.kusto.invalid",
+    "KUSTO_DATABASE_NAME": "bench-db",
+    "KUSTO_CLIENT_ID": "bench",
+    "KUSTO_CLIENT_SECRET": "bench",
+    "KUSTO_TENANT_ID": "bench",
+    "OPENAI_API_KEY": "bench",
+    "ANTHROPIC_API_KEY": "bench",
+    "ORGANIZATION_ID": "bench-org",
+    "ENVIRONMENT_ID": "bench-env",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8101", help="base URL of benchmarks.fake_llm")
+    parser.add_argument("--rows", type=int, default=1000, help="rows returned per Kusto query")
+    parser.add_argument("--kusto-latency-ms", type=float, default=50, help="round trip added to each Kusto query")
+    parser.add_argument("--kusto-mbps", type=float, default=50, help="transfer rate for Kusto results, in MB/s (0 = instant)")
+    parser.add_argument("--rollups", action="store_true", help="sync and serve the local rollups (off by default)")
+    args = parser.parse_args()
+
+    # Settings are read on first use, so the environment has to be in place before the app is imported
+    state_dir = tempfile.mkdtemp(prefix="insights_bench_")
+    for name, value in BENCH_ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+    os.environ["OPENAI_BASE_URL"] = f"{args.llm_url.rstrip('/')}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = args.llm_url.rstrip("/")
+    os.environ.setdefault("CODE_CACHE_PATH", os.path.join(state_dir, "code_cache.json"))
+    os.environ.setdefault("CHART_STORE_DIR", os.path.join(state_dir, "charts"))
+    os.environ.setdefault("ROLLUP_DB_PATH", os.path.join(state_dir, "rollups.db"))
+    # Fake Kusto data is random, so rollups would only add a backfill to the measurements
+    os.environ["ROLLUP_ENABLED"] = "true" if args.rollups else "false"
+
+    import uvicorn
+    from benchmarks import fake_kusto
+    from app.main import app
+
+    fake_kusto.install(args.rows, args.kusto_latency_ms / 1000, args.kusto_mbps * 1024 * 1024)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
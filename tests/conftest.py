@@ -0,0 +1,16 @@
+import os
+
+# Settings the app requires; tests never reach the real services
+for name, value in {
+    "KUSTO_CLUSTER_URL": "https://test.kusto.windows.net",
+    "KUSTO_DATABASE_NAME": "test",
+    "KUSTO_CLIENT_ID": "test",
+    "KUSTO_CLIENT_SECRET": "test",
+    "KUSTO_TENANT_ID": "test",
+    "OPENAI_API_KEY": "test",
+    "ANTHROPIC_API_KEY": "test",
+    "ORGANIZATION_ID": "org-test",
+    "ENVIRONMENT_ID": "env-test",
+    "ROLLUP_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
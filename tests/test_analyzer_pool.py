@@ -0,0 +1,18 @@
+from app.core.analyzer_pool import AnalyzerPool
+from fastapi import HTTPException
+import asyncio
+import pytest
+
+
+def test_checkout_times_out_without_workers():
+    async def scenario():
+        pool = AnalyzerPool(size=1, max_queue=4, max_jobs_per_worker=10, max_rss_bytes=1 << 30, job_timeout=0.05)
+        # Workers that never come up, e.g. because spawning keeps failing
+        pool._started = True
+        with pytest.raises(HTTPException) as error:
+            await pool.run("", "")
+        assert error.value.status_code == 503
+        assert pool.stats()["checkout_timeouts"] == 1
+        assert pool.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+from app.api.routes import charts
+from app.core.chart_store import PNG_SIGNATURE, ChartStore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import base64
+import os
+import struct
+
+
+def png(width: int, height: int, padding: int = 0) -> str:
+    header = PNG_SIGNATURE + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height)
+    return base64.b64encode(header + bytes(5 + padding)).decode("ascii")
+
+
+def test_identical_charts_are_stored_once(tmp_path):
+    store = ChartStore(str(tmp_path), max_bytes=1 << 20)
+    first = store.save(png(800, 600))
+    assert first["width"] == 800 and first["height"] == 600
+    assert store.save(png(800, 600)) == first
+    assert store.stats()["stored"] == 1 and store.stats()["deduplicated"] == 1
+    assert store.path_for(first["id"]) == os.path.join(str(tmp_path), f"{first['id']}.png")
+
+
+def test_invalid_charts_and_ids_are_rejected(tmp_path):
+    store = ChartStore(str(tmp_path), max_bytes=1 << 20)
+    assert store.save("not base64!") is None
+    assert store.path_for("../../etc/passwd") is None
+    assert store.path_for("0" * 64) is None
+
+
+def test_oldest_charts_are_pruned_past_the_budget(tmp_path):
+    store = ChartStore(str(tmp_path), max_bytes=1000)
+    saved = []
+    for index in range(5):
+        saved.append(store.save(png(index + 1, 1, padding=300)))
+        # Distinct write times, oldest first
+        path = store.path_for(saved[-1]["id"])
+        os.utime(path, (index, index))
+    assert store.stats()["pruned"] > 0
+    assert store.stats()["bytes"] <= 1000
+    assert store.path_for(saved[0]["id"]) is None
+    assert store.path_for(saved[-1]["id"]) is not None
+
+
+def test_etag_revalidation(tmp_path, monkeypatch):
+    store = ChartStore(str(tmp_path), max_bytes=1 << 20)
+    chart_id = store.save(png(10, 10))["id"]
+    monkeypatch.setattr(charts, "get_chart_store", lambda: store)
+    app = FastAPI()
+    app.include_router(charts.router)
+    client = TestClient(app)
+
+    response = client.get(f"/charts/{chart_id}")
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{chart_id}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert client.get(f"/charts/{chart_id}", headers={"If-None-Match": f'"{chart_id}"'}).status_code == 304
+    assert client.get("/charts/" + "0" * 64).status_code == 404
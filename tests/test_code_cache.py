@@ -0,0 +1,45 @@
+from app.core.code_cache import CodeCache, schema_fingerprint
+import asyncio
+import json
+
+
+def test_key_ignores_case_punctuation_and_tool_order(tmp_path):
+    cache = CodeCache(str(tmp_path / "cache.json"), max_entries=10, fingerprint="schemas-v1")
+    key = cache.make_key("Show traffic, last week!", ["Traffic Data Tool", "Error Data Tool"])
+    assert cache.make_key("  show TRAFFIC last   week ", ["Error Data Tool", "Traffic Data Tool"]) == key
+    assert cache.make_key("Show traffic last month", ["Traffic Data Tool", "Error Data Tool"]) != key
+    assert cache.make_key("Show traffic last week", ["Traffic Data Tool"]) != key
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    async def scenario():
+        cache = CodeCache(str(tmp_path / "cache.json"), max_entries=2, fingerprint="schemas-v1")
+        await cache.put("a", "code a")
+        await cache.put("b", "code b")
+        assert cache.get("a") == "code a"
+        await cache.put("c", "code c")
+        assert cache.get("b") is None
+        assert cache.get("a") == "code a" and cache.get("c") == "code c"
+        assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 3, "misses": 1, "stores": 3}
+
+    asyncio.run(scenario())
+
+
+def test_entries_survive_a_restart_unless_schemas_change(tmp_path):
+    path = str(tmp_path / "cache.json")
+    asyncio.run(CodeCache(path, max_entries=10, fingerprint="schemas-v1").put("a", "code a"))
+    assert CodeCache(path, max_entries=10, fingerprint="schemas-v1").get("a") == "code a"
+    assert CodeCache(path, max_entries=10, fingerprint="schemas-v2").get("a") is None
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{not json")
+    assert CodeCache(str(path), max_entries=10, fingerprint="schemas-v1").stats()["entries"] == 0
+
+
+def test_schema_fingerprint_follows_schema_files(tmp_path):
+    (tmp_path / "traffic_schema.json").write_text(json.dumps([[{"a": 1}]]))
+    before = schema_fingerprint(str(tmp_path))
+    (tmp_path / "traffic_schema.json").write_text(json.dumps([[{"a": 2}]]))
+    assert schema_fingerprint(str(tmp_path)) != before
@@ -0,0 +1,82 @@
+from app.core.forecasting import (Forecaster, candidate_methods, fit_ewma, fit_holt_winters, fit_linear,
+                                  select_method)
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+
+def test_concurrent_forecasts_share_the_cache_safely():
+    forecaster = Forecaster(max_entries=4, max_horizon=48)
+    rng = np.random.default_rng(0)
+    series = {f"api-{index}": 100 + rng.normal(0, 5, 72) for index in range(16)}
+
+    def forecast(api: str):
+        return forecaster.forecast((api, "hits", "1h"), series[api], "end", 12)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(forecast, [api for api in series for _ in range(4)]))
+
+    stats = forecaster.stats()
+    assert len(results) == 64
+    assert stats["models"] <= 4
+    assert stats["fits"] + stats["hits"] == 64
+    assert sum(stats["methods"].values()) == stats["fits"]
+
+
+def seasonal_series(days: int = 14) -> np.ndarray:
+    hours = np.arange(days * 24)
+    return 1000 + 2 * hours + 300 * np.sin(2 * np.pi * hours / 24)
+
+
+def test_linear_fit_recovers_a_trend():
+    model = fit_linear(5 + 3 * np.arange(20, dtype=float))
+    assert model.params["slope"] == pytest.approx(3)
+    assert model.forecast(2) == pytest.approx([65, 68])
+    assert model.residual_std == pytest.approx(0, abs=1e-9)
+
+
+def test_ewma_follows_a_level_shift():
+    model = fit_ewma(np.array([10.0] * 20 + [50.0] * 20))
+    assert model.forecast(3) == pytest.approx([50, 50, 50], abs=1)
+    # Errors carry over, so later steps are less certain
+    spread = model.spread(5)
+    assert np.all(np.diff(spread) >= 0)
+
+
+def test_holt_winters_fits_a_daily_season():
+    values = seasonal_series()
+    model = fit_holt_winters(values, 24)
+    hours = np.arange(len(values), len(values) + 24)
+    expected = 1000 + 2 * hours + 300 * np.sin(2 * np.pi * hours / 24)
+    assert np.mean(np.abs(model.forecast(24) - expected)) < 30
+
+
+def test_method_selection():
+    assert select_method(seasonal_series(), 24, 24) == "holt_winters"
+    assert select_method(5 + 3 * np.arange(60, dtype=float), None, 10) == "linear"
+    # Too short for a seasonal model
+    assert "holt_winters" not in candidate_methods(40, 24)
+    assert select_method(np.array([1.0, 2.0]), None, 1) == "ewma"
+
+
+def test_forecaster_reuses_models_for_the_same_series():
+    forecaster = Forecaster(max_entries=4, max_horizon=48)
+    values = seasonal_series()
+    first = forecaster.forecast(("orders", "hits", "1h"), values, "2024-10-15", 12)
+    longer = forecaster.forecast(("orders", "hits", "1h"), values, "2024-10-15", 500)
+    assert not first.cached and longer.cached
+    assert len(longer.values) == 48
+    assert longer.values[:12] == first.values
+    assert all(low <= value <= high for low, value, high in zip(longer.lower, longer.values, longer.upper))
+    # New data means a new fit
+    assert not forecaster.forecast(("orders", "hits", "1h"), values[1:], "2024-10-15T01", 12).cached
+
+
+def test_forecaster_rejects_bad_requests():
+    forecaster = Forecaster(max_entries=4, max_horizon=48)
+    with pytest.raises(ValueError):
+        forecaster.forecast(("orders", "hits", "1h"), np.array([]), "end", 12)
+    with pytest.raises(ValueError):
+        forecaster.forecast(("orders", "hits", "1h"), np.ones(30), "end", 12, method="holt_winters")
+    with pytest.raises(ValueError):
+        forecaster.forecast(("orders", "hits", "1h"), np.ones(30), "end", 12, method="arima")
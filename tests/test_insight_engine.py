@@ -0,0 +1,60 @@
+from app.core.insight_engine import ERROR_TOOL, LATENCY_TOOL, TRAFFIC_TOOL, ForecastIntent, InsightEngine, parse_horizon
+from app.utils.query_helper import DAILY, HOURLY
+import pytest
+
+
+@pytest.mark.parametrize("user_query, tool, name", [
+    ("How much traffic did we get last week?", TRAFFIC_TOOL, "traffic_volume"),
+    ("How many requests hit the orders API yesterday?", TRAFFIC_TOOL, "traffic_volume"),
+    ("Show the 5xx responses for the last day", TRAFFIC_TOOL, "status_codes"),
+    ("Which errors happened most this month?", ERROR_TOOL, "error_breakdown"),
+    ("What was the p95 latency over the last 3 days?", LATENCY_TOOL, "latency_trend"),
+])
+def test_common_shapes_match(user_query, tool, name):
+    intent = InsightEngine(enabled=True).match(user_query, [tool])
+    assert intent is not None and intent.name == name
+
+
+@pytest.mark.parametrize("user_query", [
+    "Compare errors with latency last week",
+    "Why did traffic drop on Monday?",
+    "Show a heatmap of traffic per minute",
+    "Summarize the orders API",
+])
+def test_other_questions_go_to_code_generation(user_query):
+    engine = InsightEngine(enabled=True)
+    assert engine.match(user_query, [TRAFFIC_TOOL]) is None
+    assert engine.fallbacks == 1
+
+
+def test_question_naming_two_sources_goes_to_code_generation():
+    assert InsightEngine(enabled=True).match("Errors and latency last week", [ERROR_TOOL, LATENCY_TOOL]) is None
+
+
+def test_other_selected_tools_fall_back_to_code_generation():
+    engine = InsightEngine(enabled=True)
+    assert engine.match("How much traffic did we get last week?", [TRAFFIC_TOOL]).name == "traffic_volume"
+    assert engine.match("How much traffic did we get last week?", [TRAFFIC_TOOL, LATENCY_TOOL]) is None
+    assert engine.match("Predict errors for tomorrow", [ERROR_TOOL, TRAFFIC_TOOL]) is None
+    assert engine.fallbacks == 2
+
+
+def test_predictions_match_forecasts():
+    engine = InsightEngine(enabled=True)
+    intent = engine.match("Forecast traffic for the next 3 days", [TRAFFIC_TOOL])
+    assert isinstance(intent, ForecastIntent) and intent.name == "forecast_traffic"
+    # No metric named: the single selected tool decides
+    assert engine.match("What will next week look like?", [LATENCY_TOOL]).name == "forecast_latency"
+    # Status codes have no forecast
+    assert engine.match("Predict the 5xx status codes for tomorrow", [TRAFFIC_TOOL]) is None
+
+
+def test_disabled_engine_matches_nothing():
+    assert InsightEngine(enabled=False).match("How much traffic did we get last week?", [TRAFFIC_TOOL]) is None
+
+
+def test_parse_horizon():
+    assert parse_horizon("traffic for the next 3 days", HOURLY) == 72
+    assert parse_horizon("errors tomorrow", HOURLY) == 24
+    assert parse_horizon("next 2 weeks", DAILY) == 14
+    assert parse_horizon("what comes next?", DAILY) == 7
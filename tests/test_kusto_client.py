@@ -0,0 +1,37 @@
+from app.core.kusto_client import KustoClientManager
+import asyncio
+import types
+
+
+class HangingClient:
+    def __init__(self):
+        self.attempts = 0
+
+    async def execute_query(self, database, query, properties=None):
+        self.attempts += 1
+        await asyncio.Event().wait()
+
+    async def close(self):
+        pass
+
+
+async def token():
+    return "token"
+
+
+def test_start_does_not_wait_for_an_unreachable_cluster():
+    async def scenario():
+        manager = KustoClientManager("https://test.kusto.windows.net", "test", "tenant", "client", "secret",
+                                     token_refresh_margin=300, retry_seconds=0.01, warmup_timeout=0.02)
+        client = manager._client = HangingClient()
+        manager._tokens = types.SimpleNamespace(get_token=token)
+
+        await asyncio.wait_for(manager.start(), timeout=1)
+        assert not manager.ready
+        # Attempts that hang are abandoned and retried
+        await asyncio.sleep(0.2)
+        assert client.attempts > 1
+        assert not manager.ready
+        await manager.stop()
+
+    asyncio.run(scenario())
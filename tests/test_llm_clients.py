@@ -0,0 +1,48 @@
+from app.config import get_settings
+from app.core import llm_clients
+import asyncio
+import types
+
+
+class RecordingCompletions:
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        await asyncio.sleep(0.01)
+        return types.SimpleNamespace(usage=None)
+
+
+def run_concurrently(monkeypatch, setting, **request):
+    completions = RecordingCompletions()
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llm_clients, "get_openai_client", lambda: client)
+    monkeypatch.setattr(get_settings(), "LLM_PLANNING_TEMPERATURE", setting)
+
+    async def scenario():
+        await asyncio.gather(*[
+            llm_clients.coalesced_openai_completion("test", model="m", messages=[], **request) for _ in range(3)
+        ])
+
+    asyncio.run(scenario())
+    return completions.requests
+
+
+def test_default_temperature_is_left_alone(monkeypatch):
+    requests = run_concurrently(monkeypatch, None)
+    assert len(requests) == 3
+    assert all("temperature" not in request for request in requests)
+
+
+def test_deterministic_calls_are_coalesced(monkeypatch):
+    assert len(run_concurrently(monkeypatch, 0)) == 1
+    assert len(run_concurrently(monkeypatch, None, temperature=0)) == 1
+    assert len(run_concurrently(monkeypatch, 0, temperature=0.7)) == 3
+
+
+def test_stats_report_whether_llm_coalescing_is_on(monkeypatch):
+    monkeypatch.setattr(get_settings(), "LLM_PLANNING_TEMPERATURE", None)
+    assert llm_clients.llm_coalescing_stats()["enabled"] is False
+    monkeypatch.setattr(get_settings(), "LLM_PLANNING_TEMPERATURE", 0)
+    assert llm_clients.llm_coalescing_stats()["enabled"] is True
@@ -0,0 +1,20 @@
+from app.core.prompt_budget import PromptGovernor
+import json
+
+
+def build_messages(payload) -> list:
+    return [{"role": "user", "content": json.dumps(payload)}]
+
+
+def test_anthropic_prompts_are_counted_with_a_margin():
+    governor = PromptGovernor("gpt-4", {"codegen": 1000})
+    payload = {"values": [index * 1.2345678 for index in range(200)]}
+    openai_tokens = governor.count_message_tokens(build_messages(payload))
+    assert governor.count_message_tokens(build_messages(payload), "anthropic") > openai_tokens
+
+    # Fits the budget as counted for OpenAI, but not with the Anthropic margin
+    governor.budgets["codegen"] = openai_tokens
+    assert governor.fit("codegen", payload, build_messages) == build_messages(payload)
+    compacted = governor.fit("codegen", payload, build_messages, provider="anthropic")
+    assert governor.count_message_tokens(compacted, "anthropic") <= openai_tokens
+    assert governor.stats()["codegen"]["compacted"] == 1
@@ -0,0 +1,71 @@
+from app.api.routes.query import RowWindow, decode_cursor, encode_cursor, row_dict
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+import asyncio
+import json
+import pytest
+
+QUERY = "traffic | order by timestamp asc"
+
+
+class Table:
+    """Stands in for a streaming primary result table."""
+
+    def __init__(self, count: int):
+        self.rows = [[index] for index in range(count)]
+
+    async def __aiter__(self):
+        for row in self.rows:
+            yield row
+
+
+def read_page(count: int, offset: int, limit: int, max_rows: int = 1000, batch_size: int = 3):
+    window = RowWindow(Table(count), offset, limit, max_rows, batch_size)
+
+    async def read():
+        return [row[0] for rows in [rows async for rows in window.batches()] for row in rows]
+
+    return asyncio.run(read()), window
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(QUERY, encode_cursor(QUERY, 250)) == 250
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(QUERY, 5)[:-4], ""])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(QUERY, cursor)
+    assert error.value.status_code == 400
+
+
+def test_cursor_of_another_query():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("errors | take 10", encode_cursor(QUERY, 5))
+    assert error.value.detail == "Cursor does not belong to this query"
+
+
+def test_pages_follow_each_other():
+    first, window = read_page(10, 0, 4)
+    assert first == [0, 1, 2, 3]
+    assert window.more and not window.exhausted
+    offset = decode_cursor(QUERY, window.page_info(QUERY)["next_cursor"])
+
+    second, window = read_page(10, offset, 4)
+    assert second == [4, 5, 6, 7]
+    last, window = read_page(10, decode_cursor(QUERY, window.page_info(QUERY)["next_cursor"]), 4)
+    assert last == [8, 9]
+    assert window.exhausted
+    assert window.page_info(QUERY)["next_cursor"] is None
+
+
+def test_row_cap_truncates_without_cursor():
+    rows, window = read_page(10, 4, 2, max_rows=6)
+    assert rows == [4, 5]
+    assert window.page_info(QUERY) == {"row_count": 2, "truncated": True, "next_cursor": None}
+
+
+def test_json_and_ndjson_format_datetimes_alike():
+    row = row_dict(["at", "took", "hits"], [datetime(2024, 10, 1, tzinfo=timezone.utc), timedelta(seconds=90), 3])
+    assert row == {"at": "2024-10-01T00:00:00+00:00", "took": "0:01:30", "hits": 3}
+    assert json.loads(json.dumps(row)) == row
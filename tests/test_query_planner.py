@@ -0,0 +1,30 @@
+from app.tools import query_planner
+from fastapi import HTTPException
+import asyncio
+import pytest
+
+
+def test_failed_call_cancels_the_other(monkeypatch):
+    cancelled = asyncio.Event()
+
+    async def extract_data(request):
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=500, detail="extraction failed")
+
+    async def select_tools(request):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(query_planner, "extract_data", extract_data)
+    monkeypatch.setattr(query_planner, "select_tools", select_tools)
+
+    async def scenario():
+        with pytest.raises(HTTPException):
+            await query_planner.plan_query("traffic last week")
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+
+    asyncio.run(scenario())
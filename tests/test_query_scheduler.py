@@ -0,0 +1,123 @@
+from app.core.query_scheduler import QueryRejected, QueryScheduler
+import asyncio
+import pytest
+
+KEY = "cluster/db"
+
+
+class Cancels:
+    def __init__(self):
+        self.request_ids = []
+
+    async def __call__(self, request_id: str):
+        self.request_ids.append(request_id)
+
+
+def free_slots(scheduler: QueryScheduler) -> int:
+    return scheduler._slots[KEY]._value
+
+
+def test_waiter_is_admitted_when_a_slot_frees():
+    async def scenario():
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=4, queue_timeout=1)
+        first = await scheduler.acquire(KEY, Cancels())
+        waiter = asyncio.ensure_future(scheduler.acquire(KEY, Cancels()))
+        await asyncio.sleep(0)
+        assert scheduler.stats()[KEY]["waiting"] == 1
+        first.completed = True
+        first.release()
+        second = await waiter
+        assert scheduler.stats()[KEY]["active"] == 1
+        second.completed = True
+        second.release()
+        assert free_slots(scheduler) == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=1, queue_timeout=1)
+        await scheduler.acquire(KEY, Cancels())
+        queued = asyncio.ensure_future(scheduler.acquire(KEY, Cancels()))
+        await asyncio.sleep(0)
+        with pytest.raises(QueryRejected):
+            await scheduler.acquire(KEY, Cancels())
+        assert scheduler.stats()[KEY]["rejected"] == 1
+        queued.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_keeps_slots():
+    async def scenario():
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=4, queue_timeout=0.01)
+        held = await scheduler.acquire(KEY, Cancels())
+        with pytest.raises(QueryRejected):
+            await scheduler.acquire(KEY, Cancels())
+        assert scheduler.stats()[KEY]["timed_out"] == 1
+        held.completed = True
+        held.release()
+        assert free_slots(scheduler) == 1
+
+    asyncio.run(scenario())
+
+
+def test_slot_freed_as_the_wait_runs_out_is_not_lost():
+    async def scenario():
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=4, queue_timeout=0.01)
+        for _ in range(50):
+            held = await scheduler.acquire(KEY, Cancels())
+            held.completed = True
+            # Free the slot on the same loop iteration the waiter gives up
+            asyncio.get_running_loop().call_later(0.01, held.release)
+            try:
+                lease = await scheduler.acquire(KEY, Cancels())
+            except QueryRejected:
+                pass
+            else:
+                lease.completed = True
+                lease.release()
+            await asyncio.sleep(0.02)
+            assert free_slots(scheduler) == 1
+            assert scheduler.stats()[KEY]["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_query_is_cancelled_on_the_server():
+    async def scenario():
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=4, queue_timeout=1)
+        cancels = Cancels()
+
+        async def query():
+            async with scheduler.admit(KEY, cancels):
+                await asyncio.Event().wait()
+
+        task = asyncio.ensure_future(query())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert len(cancels.request_ids) == 1
+        assert scheduler.stats()[KEY]["cancelled"] == 1
+        assert free_slots(scheduler) == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=4, queue_timeout=1)
+        held = await scheduler.acquire(KEY, Cancels())
+        waiter = asyncio.ensure_future(scheduler.acquire(KEY, Cancels()))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.stats()[KEY]["waiting"] == 0
+        held.completed = True
+        held.release()
+        await asyncio.sleep(0)
+        assert free_slots(scheduler) == 1
+
+    asyncio.run(scenario())
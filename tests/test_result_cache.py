@@ -0,0 +1,92 @@
+from app.core.dataset import TIME_COLUMN
+from app.core.result_cache import ToolResultCache, merge_interval, subtract_intervals
+from app.utils.query_helper import HOURLY
+from datetime import datetime, timedelta, timezone
+import asyncio
+import pandas as pd
+
+START = datetime(2024, 10, 1, tzinfo=timezone.utc)
+
+
+async def hourly_rows(start: datetime, end: datetime) -> pd.DataFrame:
+    times = pd.date_range(start, end, freq="1h", inclusive="left")
+    return pd.DataFrame({TIME_COLUMN: times, "totalHits": range(len(times))})
+
+
+def test_eviction_removes_entries():
+    async def scenario():
+        cache = ToolResultCache(max_bytes=4096, settle_seconds=0)
+        for api in range(50):
+            await cache.fetch(("traffic", f"api-{api}"), HOURLY, START, START + timedelta(days=1), hourly_rows)
+        assert cache.evictions > 0
+        assert len(cache._entries) == cache.stats()["entries"] < 50
+        assert cache.bytes == sum(entry.size for entry in cache._entries.values())
+
+    asyncio.run(scenario())
+
+
+def test_open_tail_leaves_no_entry():
+    async def scenario():
+        cache = ToolResultCache(max_bytes=1 << 20, settle_seconds=0)
+        now = HOURLY.floor(datetime.now(timezone.utc))
+        for api in range(10):
+            await cache.fetch(("traffic", f"api-{api}"), HOURLY, now, now + timedelta(hours=2), hourly_rows)
+        assert len(cache._entries) == 0
+
+    asyncio.run(scenario())
+
+
+def utc(*parts) -> datetime:
+    return datetime(*parts, tzinfo=timezone.utc)
+
+
+def test_subtract_intervals():
+    covered = [(utc(2024, 10, 1, 2), utc(2024, 10, 1, 4)), (utc(2024, 10, 1, 6), utc(2024, 10, 1, 8))]
+    assert subtract_intervals((utc(2024, 10, 1, 0), utc(2024, 10, 1, 10)), covered) == [
+        (utc(2024, 10, 1, 0), utc(2024, 10, 1, 2)),
+        (utc(2024, 10, 1, 4), utc(2024, 10, 1, 6)),
+        (utc(2024, 10, 1, 8), utc(2024, 10, 1, 10)),
+    ]
+    assert subtract_intervals((utc(2024, 10, 1, 2), utc(2024, 10, 1, 4)), covered) == []
+    assert subtract_intervals((utc(2024, 10, 1, 3), utc(2024, 10, 1, 7)), covered) == [
+        (utc(2024, 10, 1, 4), utc(2024, 10, 1, 6))
+    ]
+
+
+def test_merge_interval_joins_touching_and_overlapping():
+    covered = [(utc(2024, 10, 1, 0), utc(2024, 10, 1, 2)), (utc(2024, 10, 1, 6), utc(2024, 10, 1, 8))]
+    assert merge_interval(covered, (utc(2024, 10, 1, 2), utc(2024, 10, 1, 3))) == [
+        (utc(2024, 10, 1, 0), utc(2024, 10, 1, 3)), (utc(2024, 10, 1, 6), utc(2024, 10, 1, 8))
+    ]
+    assert merge_interval(covered, (utc(2024, 10, 1, 1), utc(2024, 10, 1, 7))) == [
+        (utc(2024, 10, 1, 0), utc(2024, 10, 1, 8))
+    ]
+
+
+def test_only_gaps_and_the_open_tail_are_fetched():
+    fetched = []
+
+    async def fetcher(start, end):
+        fetched.append((start, end))
+        return await hourly_rows(start, end)
+
+    async def scenario():
+        cache = ToolResultCache(max_bytes=1 << 20, settle_seconds=900)
+        now = HOURLY.floor(datetime.now(timezone.utc))
+        history_start = now - timedelta(hours=12)
+        first = await cache.fetch(("traffic",), HOURLY, history_start, now - timedelta(hours=6), fetcher)
+        frame = await cache.fetch(("traffic",), HOURLY, history_start, now + timedelta(hours=1), fetcher)
+        # Buckets closed before the settle cutoff are cached; the rest is fetched again next time
+        again = await cache.fetch(("traffic",), HOURLY, history_start, now + timedelta(hours=1), fetcher)
+        return first, frame, again, now, history_start
+
+    first, frame, again, now, history_start = asyncio.run(scenario())
+    sealed_until = HOURLY.floor(datetime.now(timezone.utc) - timedelta(seconds=900))
+    assert fetched == [
+        (history_start, now - timedelta(hours=6)),
+        (now - timedelta(hours=6), now + timedelta(hours=1)),
+        (sealed_until, now + timedelta(hours=1)),
+    ]
+    assert len(first) == 6
+    assert len(frame) == len(again) == 13
+    assert frame[TIME_COLUMN].is_monotonic_increasing
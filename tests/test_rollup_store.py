@@ -0,0 +1,135 @@
+from app.core.dataset import TIME_COLUMN, normalize_frame
+from app.core.result_cache import ToolResultCache
+from app.core.rollup_store import RollupStore
+from app.tools import registry
+from app.tools.registry import NO_API, ToolSpec, get_tool_registry
+from app.utils.query_helper import DAILY, HOURLY, MONTHLY, WEEKLY
+from datetime import datetime, timedelta, timezone
+import asyncio
+import pandas as pd
+import pytest
+
+
+def utc(*parts) -> datetime:
+    return datetime(*parts, tzinfo=timezone.utc)
+
+
+# Coverage as left by a daily retention of 186 days: not on a month boundary
+COVERED_FROM, COVERED_UNTIL = utc(2026, 4, 15), utc(2026, 10, 18)
+
+
+def traffic_rows(bucket, start: datetime, end: datetime) -> pd.DataFrame:
+    times = pd.date_range(start, end, freq={"1h": "1h", "1d": "1D", "1mo": "MS"}[bucket.label], inclusive="left")
+    frame = pd.DataFrame({
+        TIME_COLUMN: list(times) * 2,
+        "bucketSize": bucket.label,
+        "apiName": ["orders"] * len(times) + ["payments"] * len(times),
+        "totalHits": [1] * len(times) + [2] * len(times),
+        "proxyResponseCode": "200",
+    })
+    return normalize_frame(frame)
+
+
+@pytest.fixture
+def traffic():
+    return get_tool_registry().get("Traffic Data Tool")
+
+
+@pytest.fixture
+def store(tmp_path, traffic):
+    store = RollupStore(str(tmp_path / "rollups.db"), "org-test", "env-test", {"1h": 31, "1d": 186},
+                        settle_seconds=900, sync_interval_seconds=900)
+    store.append(traffic, DAILY, traffic_rows(DAILY, COVERED_FROM, COVERED_UNTIL), COVERED_FROM, COVERED_UNTIL)
+    yield store
+    asyncio.run(store.stop())
+
+
+def test_six_month_window_is_served_past_coverage_start(store, traffic):
+    # A six month question starts on the 1st, before the oldest stored day
+    assert store.servable(traffic, MONTHLY, utc(2026, 4, 1), utc(2026, 11, 1)) == (utc(2026, 5, 1), utc(2026, 10, 1))
+
+
+def test_six_month_fetch_only_queries_uncovered_months(store, traffic, monkeypatch):
+    queried = []
+
+    async def query_window(self, api_name, bucket, start, end):
+        queried.append((start, end))
+        return traffic_rows(bucket, start, end)
+
+    monkeypatch.setattr(registry, "get_rollup_store", lambda: store)
+    monkeypatch.setattr(registry, "get_tool_cache", lambda: ToolResultCache(1 << 20, 900))
+    monkeypatch.setattr(ToolSpec, "query_window", query_window)
+
+    frame = asyncio.run(traffic.fetch_window(NO_API, MONTHLY, utc(2026, 4, 1), utc(2026, 11, 1)))
+    assert queried == [(utc(2026, 4, 1), utc(2026, 5, 1)), (utc(2026, 10, 1), utc(2026, 11, 1))]
+    may = frame[(frame[TIME_COLUMN] == utc(2026, 5, 1)) & (frame["apiName"] == "payments")]
+    assert may["totalHits"].tolist() == [62]
+    assert sorted(frame[TIME_COLUMN].unique()) == [utc(2026, month, 1) for month in range(4, 11)]
+
+
+def test_weekly_sums_match_pandas(store, traffic):
+    start, end = utc(2026, 5, 4), utc(2026, 6, 1)
+    assert store.servable(traffic, WEEKLY, start, end) == (start, end)
+    frame = store.read(traffic, WEEKLY, None, start, end)
+
+    daily = traffic_rows(DAILY, start, end)
+    expected = (daily.assign(**{TIME_COLUMN: daily[TIME_COLUMN].map(WEEKLY.floor)})
+                .groupby([TIME_COLUMN, "apiName", "proxyResponseCode"], observed=True)["totalHits"].sum())
+    actual = frame.set_index([TIME_COLUMN, "apiName", "proxyResponseCode"])["totalHits"]
+    assert actual.sort_index().tolist() == expected.sort_index().tolist()
+    assert set(frame["bucketSize"]) == {"7d"}
+
+
+def test_api_filter(store, traffic):
+    frame = store.read(traffic, DAILY, "orders", utc(2026, 5, 1), utc(2026, 5, 8))
+    assert set(frame["apiName"]) == {"orders"} and len(frame) == 7
+
+
+def test_percentiles_are_not_summed(store):
+    latency = get_tool_registry().get("Latency Data Tool")
+    assert store.source_for(latency, WEEKLY) is None
+    assert store.source_for(latency, DAILY) == DAILY
+
+
+def test_straddling_buckets_come_from_kusto(store, traffic):
+    # The open week at the end of coverage is not served
+    assert store.servable(traffic, WEEKLY, utc(2026, 9, 28), utc(2026, 10, 26))[1] == WEEKLY.floor(COVERED_UNTIL)
+    # Nothing stored for hourly buckets yet
+    assert store.servable(traffic, HOURLY, utc(2026, 10, 1), utc(2026, 10, 2)) is None
+
+
+def test_store_of_another_scope_is_rebuilt(tmp_path, traffic):
+    path = str(tmp_path / "rollups.db")
+    first = RollupStore(path, "org-a", "env", {"1h": 31, "1d": 186}, settle_seconds=900, sync_interval_seconds=900)
+    first.append(traffic, DAILY, traffic_rows(DAILY, COVERED_FROM, COVERED_UNTIL), COVERED_FROM, COVERED_UNTIL)
+    asyncio.run(first.stop())
+
+    second = RollupStore(path, "org-b", "env", {"1h": 31, "1d": 186}, settle_seconds=900, sync_interval_seconds=900)
+    assert second.servable(traffic, DAILY, utc(2026, 5, 1), utc(2026, 6, 1)) is None
+    asyncio.run(second.stop())
+
+
+def test_sync_appends_settled_buckets_and_prunes(tmp_path, traffic, monkeypatch):
+    queried = []
+
+    async def query_rollup(self, bucket, start, end):
+        queried.append((bucket.label, start, end))
+        return traffic_rows(bucket, start, end)
+
+    monkeypatch.setattr(ToolSpec, "query_rollup", query_rollup)
+    store = RollupStore(str(tmp_path / "rollups.db"), "org-test", "env-test", {"1h": 2, "1d": 10},
+                        settle_seconds=900, sync_interval_seconds=900)
+    asyncio.run(store.sync([traffic]))
+    # The first run backfills the retention period up to the settled buckets
+    now = datetime.now(timezone.utc)
+    daily = [(start, end) for label, start, end in queried if label == "1d"]
+    assert daily[0][0] == DAILY.floor(now - timedelta(days=10))
+    assert daily[-1][1] == DAILY.floor(now - timedelta(seconds=900))
+    synced_until = {label: end for label, start, end in queried}
+
+    first_run = len(queried)
+    asyncio.run(store.sync([traffic]))
+    # Later runs only query what settled since
+    assert all(start >= synced_until[label] for label, start, end in queried[first_run:])
+    assert set(store.stats()["coverage"]) == {"traffic_data_tool/1h", "traffic_data_tool/1d"}
+    asyncio.run(store.stop())
@@ -0,0 +1,32 @@
+from app.config import get_settings
+from app.tools.registry import SharedFetches, ToolSpec, get_tool_registry
+import asyncio
+import pandas as pd
+
+
+def test_batch_stays_within_fanout(monkeypatch):
+    running, peak = 0, 0
+
+    async def fetch(self, api_name, start_time, end_time, bucket=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return pd.DataFrame()
+
+    monkeypatch.setattr(ToolSpec, "fetch", fetch)
+    monkeypatch.setattr(get_settings(), "CHAT_MAX_TOOL_FANOUT", 2)
+    registry = get_tool_registry()
+
+    async def scenario():
+        shared = SharedFetches(registry)
+        questions = [
+            shared.run(list(registry.tools), api, "2024-10-01T00:00:00Z", "2024-10-02T00:00:00Z")
+            for api in ("orders", "payments", "users")
+        ]
+        await asyncio.gather(*questions)
+        assert shared.stats() == {"requested": 9, "executed": 9}
+
+    asyncio.run(scenario())
+    assert peak == 2
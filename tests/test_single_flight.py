@@ -0,0 +1,126 @@
+from app.config import get_settings
+from app.core.kusto_client import get_kusto_manager
+from app.core.single_flight import SingleFlight
+from app.tools.registry import get_tool_registry
+from app.utils.request_helper import CLIENT_CLOSED_REQUEST, cancel_on_disconnect
+from benchmarks.fake_kusto import FakeKustoClient
+from fastapi import HTTPException
+import asyncio
+import pytest
+import types
+
+START, END = "2024-10-01T00:00:00Z", "2024-10-02T00:00:00Z"
+
+
+class HangingKustoClient(FakeKustoClient):
+    """Queries never finish; management commands are recorded."""
+
+    def __init__(self):
+        super().__init__(rows_per_query=10)
+        self.commands = []
+
+    async def execute(self, database, query, properties=None):
+        await asyncio.Event().wait()
+
+    async def execute_mgmt(self, database, query, properties=None):
+        self.commands.append(query)
+
+
+@pytest.fixture
+def kusto():
+    client = HangingKustoClient()
+    get_kusto_manager()._client = client
+    return client
+
+
+async def settle():
+    # Background cancellation of the server-side query runs on later loop iterations
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiter_cancelled_keeps_call_for_others():
+    async def scenario():
+        group = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(group.do("key", call))
+        second = asyncio.ensure_future(group.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert group.in_flight("key")
+        release.set()
+        assert await second == "done"
+        assert group.stats() == {"executions": 1, "coalesced": 1, "abandoned": 0, "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+def test_last_waiter_cancelled_cancels_call():
+    async def scenario():
+        group = SingleFlight("test")
+        cancelled = asyncio.Event()
+
+        async def call():
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(group.do("key", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert cancelled.is_set()
+        assert not group.in_flight("key")
+        assert group.stats()["abandoned"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_tool_timeout_cancels_kusto_query(kusto):
+    async def scenario():
+        registry = get_tool_registry()
+        settings = get_settings()
+        timeout, settings.TOOL_TIMEOUT_SECONDS = settings.TOOL_TIMEOUT_SECONDS, 0.05
+        try:
+            with pytest.raises(HTTPException) as error:
+                await registry.run(["Traffic Data Tool"], "timeout-api", START, END)
+        finally:
+            settings.TOOL_TIMEOUT_SECONDS = timeout
+        assert error.value.status_code == 504
+        await settle()
+        assert any(command.startswith(".cancel query") for command in kusto.commands)
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_cancels_kusto_query(kusto):
+    async def scenario():
+        registry = get_tool_registry()
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        request = types.SimpleNamespace(receive=receive, method="POST", url=types.SimpleNamespace(path="/chat"))
+        answer = asyncio.ensure_future(cancel_on_disconnect(
+            request, registry.run(["Error Data Tool"], "disconnect-api", START, END)
+        ))
+        await asyncio.sleep(0.05)
+        disconnected.set()
+        with pytest.raises(HTTPException) as error:
+            await answer
+        assert error.value.status_code == CLIENT_CLOSED_REQUEST
+        await settle()
+        assert any(command.startswith(".cancel query") for command in kusto.commands)
+
+    asyncio.run(scenario())